@@ -0,0 +1,76 @@
+"""Cost of browsing a cached category page.
+
+Compares rebuilding the stations from the cached raw ``matches`` on every
+browse, as the client used to, with serving the cached station tuple.
+
+Run from the repository root with ``python -m benchmarks.bench_category_browse``.
+"""
+
+import timeit
+from unittest import mock
+
+from mopidy_radionet.library import RadioNetLibraryProvider
+from mopidy_radionet.radionet import RadioNetClient
+
+REPEAT = 2000
+
+
+def page(number):
+    return {
+        "numberPages": 1,
+        "categories": [
+            {
+                "matches": [
+                    {
+                        "id": number * 100 + index,
+                        "continent": {"value": "Europe"},
+                        "country": {"value": "Germany"},
+                        "city": {"value": "Berlin"},
+                        "name": {"value": "Station %d" % index},
+                        "subdomain": {"value": "station%d" % (number * 100 + index)},
+                        "shortDescription": {"value": "Description %d" % index},
+                        "logo44x44": "https://static.radio.net/%d_44.png" % index,
+                        "logo100x100": "https://static.radio.net/%d_100.png" % index,
+                        "logo175x175": "https://static.radio.net/%d_175.png" % index,
+                    }
+                    for index in range(50)
+                ]
+            }
+        ],
+    }
+
+
+def main():
+    client = RadioNetClient()
+    backend = mock.Mock()
+    backend.radionet = client
+    library = RadioNetLibraryProvider(backend)
+
+    raw = page(1)
+    client.set_cache("topstations/1", client._get_stations_from_matches(raw), 10)
+
+    def rematerialise():
+        return [
+            client._get_station_from_search_result(match)
+            for match in raw["categories"][0]["matches"]
+        ]
+
+    def cached():
+        return client.get_category("topstations", 1)
+
+    def browse():
+        return library.browse("radionet:topstations")
+
+    assert rematerialise() == cached()
+
+    old = min(timeit.repeat(rematerialise, number=REPEAT, repeat=5)) / REPEAT
+    new = min(timeit.repeat(cached, number=REPEAT, repeat=5)) / REPEAT
+    refs = min(timeit.repeat(browse, number=REPEAT, repeat=5)) / REPEAT
+    print("get_category, rebuild stations:  %7.1f us/page" % (old * 1e6))
+    print("get_category, cached stations:   %7.1f us/page" % (new * 1e6))
+    print("speedup:                         %7.1fx" % (old / new))
+    print("full browse incl. Ref models:    %7.1f us/page" % (refs * 1e6))
+
+
+if __name__ == "__main__":
+    main()
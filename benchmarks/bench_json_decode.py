@@ -0,0 +1,111 @@
+"""Decode and normalisation time of a 50 station search page.
+
+The page mimics the API's search results, which carry many fields the client
+never reads. Decoding is timed with every installed JSON library, and
+normalisation into stations is timed for stations seen for the first time
+and for stations seen again, with the local search index enabled.
+
+Run from the repository root with ``python -m benchmarks.bench_json_decode``.
+"""
+
+import json
+import time
+import timeit
+from unittest import mock
+
+from mopidy_radionet.decoding import DECODERS
+from mopidy_radionet.index import StationIndex
+from mopidy_radionet.radionet import RadioNetClient
+
+REPEAT = 200
+
+
+def match(station_id):
+    return {
+        "id": station_id,
+        "name": {"value": "Radio Station %d" % station_id},
+        "subdomain": {"value": "station%d" % station_id},
+        "shortDescription": {"value": "Pop, rock and news around the clock"},
+        "description": {"value": "A longer description of the station. " * 8},
+        "continent": {"value": "Europe"},
+        "country": {"value": "Germany"},
+        "city": {"value": "Berlin"},
+        "region": {"value": "Berlin"},
+        "genres": [{"value": "Pop"}, {"value": "Rock"}, {"value": "News"}],
+        "topics": [{"value": "Charts"}, {"value": "Hits"}],
+        "languages": [{"value": "German"}],
+        "logo44x44": "https://static.radio.net/images/broadcasts/%d_44.png"
+        % station_id,
+        "logo100x100": "https://static.radio.net/images/broadcasts/%d_100.png"
+        % station_id,
+        "logo175x175": "https://static.radio.net/images/broadcasts/%d_175.png"
+        % station_id,
+        "logo300x300": "https://static.radio.net/images/broadcasts/%d_300.png"
+        % station_id,
+        "logo630x630": "https://static.radio.net/images/broadcasts/%d_630.png"
+        % station_id,
+        "website": "https://www.station%d.example.com/" % station_id,
+        "rank": station_id % 1000,
+        "bitrate": 128,
+        "type": "STATION",
+        "playable": "PLAYABLE",
+        "adParams": "st_city=Berlin&st_cont=Europe&st_country=Germany",
+        "lastModified": 1672531200000,
+    }
+
+
+def page():
+    return json.dumps(
+        {
+            "numberPages": 20,
+            "numberEpisodes": 0,
+            "categories": [
+                {
+                    "name": "Search results",
+                    "matches": [match(1000 + index) for index in range(50)],
+                }
+            ],
+        }
+    ).encode("utf-8")
+
+
+def main():
+    payload = page()
+    print("page size: %d bytes, 50 stations" % len(payload))
+
+    for name in ("json", "ujson", "orjson"):
+        if name not in DECODERS:
+            print("%-28s not installed" % ("decode, " + name))
+            continue
+        loads = DECODERS[name]
+        seconds = min(timeit.repeat(lambda: loads(payload), number=REPEAT, repeat=5))
+        print("%-28s %8.1f us/page" % ("decode, " + name, seconds / REPEAT * 1e6))
+
+    matches = json.loads(payload)["categories"][0]["matches"]
+    client = RadioNetClient()
+    client.station_index = StationIndex()
+
+    def normalise():
+        return [client._get_station_from_search_result(m) for m in matches]
+
+    def first_sight():
+        client.stations_by_id.clear()
+        client.stations_by_slug.clear()
+        client.station_index = StationIndex()
+        started = time.perf_counter()
+        normalise()
+        return time.perf_counter() - started
+
+    first = min(first_sight() for _ in range(REPEAT))
+    normalise()
+    again = min(timeit.repeat(normalise, number=REPEAT, repeat=5)) / REPEAT
+    # without the unchanged-station check every field is set and indexed again
+    with mock.patch("mopidy_radionet.radionet.MATCH_FIELDS", ()):
+        rebuilt = min(timeit.repeat(normalise, number=REPEAT, repeat=5)) / REPEAT
+    print("%-28s %8.1f us/page" % ("normalise, first sight", first * 1e6))
+    print("%-28s %8.1f us/page" % ("normalise, seen again", again * 1e6))
+    print("%-28s %8.1f us/page" % ("  without unchanged check", rebuilt * 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Memory used per cached station, before and after the compact Station.
+
+Run from the repository root with ``python -m benchmarks.bench_station_memory``.
+"""
+
+import gc
+import json
+import tracemalloc
+
+from mopidy_radionet.radionet import RadioNetClient, Station, _intern
+
+STATIONS = 20000
+# the layout of the logo URLs the API currently returns
+LOGO = "https://station-images-prod.radio-assets.com/%d/station%d.png"
+
+
+class DictStation(object):
+    id = None
+    continent = None
+    country = None
+    city = None
+    genres = None
+    name = None
+    stream_url = None
+    image_tiny = None
+    image_small = None
+    image_medium = None
+    image_large = None
+    description = None
+    playable = False
+
+
+def matches():
+    # decoded JSON gives every station its own copy of the location strings
+    return json.loads(
+        json.dumps(
+            [
+                {
+                    "id": station_id,
+                    "continent": {"value": "Europe"},
+                    "country": {"value": "Germany"},
+                    "city": {"value": "Berlin"},
+                    "name": {"value": "Station %d" % station_id},
+                    "subdomain": {"value": "station%d" % station_id},
+                    "shortDescription": {"value": "Description %d" % station_id},
+                    "logo44x44": LOGO % (44, station_id),
+                    "logo100x100": LOGO % (100, station_id),
+                    "logo175x175": LOGO % (175, station_id),
+                }
+                for station_id in range(STATIONS)
+            ]
+        )
+    )
+
+
+def dict_stations(results):
+    # the indexes the client kept before Station got __slots__
+    stations = {}
+    stations_by_slug = {}
+    for result in results:
+        station = DictStation()
+        station.id = result["id"]
+        station.continent = result["continent"]["value"]
+        station.country = result["country"]["value"]
+        station.city = result["city"]["value"]
+        station.name = result["name"]["value"]
+        station.slug = result["subdomain"]["value"]
+        station.description = result["shortDescription"]["value"]
+        station.image_tiny = result["logo44x44"]
+        station.image_small = result["logo100x100"]
+        station.image_medium = result["logo175x175"]
+        station.playable = True
+        stations[station.id] = station
+        stations_by_slug[station.slug] = station
+    return stations, stations_by_slug
+
+
+def slot_stations(results):
+    stations = {}
+    stations_by_slug = {}
+    for result in results:
+        station = Station(result["id"])
+        station.continent = _intern(result["continent"]["value"])
+        station.country = _intern(result["country"]["value"])
+        station.city = _intern(result["city"]["value"])
+        station.name = result["name"]["value"]
+        station.slug = result["subdomain"]["value"]
+        station.description = result["shortDescription"]["value"]
+        station.set_images(
+            result["logo44x44"], result["logo100x100"], result["logo175x175"]
+        )
+        station.playable = True
+        stations[station.id] = station
+        stations_by_slug[station.slug] = station
+    return stations, stations_by_slug
+
+
+def client_stations(results):
+    client = RadioNetClient()
+    client.set_cache_size(None, None)
+    for result in results:
+        client._get_station_from_search_result(result)
+    return client
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    results = matches()
+    kept = build(results)
+    del results
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return used
+
+
+def main():
+    old = measure(dict_stations)
+    new = measure(slot_stations)
+    client = measure(client_stations)
+    print("stations:                 %d" % STATIONS)
+    print("dict Station:             %d bytes/station" % (old / STATIONS))
+    print("compact Station:          %d bytes/station" % (new / STATIONS))
+    print("reduction:                %.0f%%" % (100 - 100.0 * new / old))
+    print("RadioNetClient, indexed:  %d bytes/station" % (client / STATIONS))
+    print("reduction:                %.0f%%" % (100 - 100.0 * client / old))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Per-URI cost of parsing radionet URIs.
+
+Compares the former regex cascade of ``RadioNetLibraryProvider.parse_uri``
+with the precompiled router in ``mopidy_radionet.uri``, with and without its
+parse cache.
+
+Run from the repository root with ``python -m benchmarks.bench_uri_router``.
+"""
+
+import re
+import timeit
+
+from mopidy_radionet.uri import parse_uri
+
+URIS = (
+    ["radionet:station:%d" % station_id for station_id in range(1000, 1050)]
+    + ["radionet:track:%d" % station_id for station_id in range(1000, 1020)]
+    + ["radionet:track:slug%d" % station_id for station_id in range(10)]
+    + ["radionet:genres:Genre%d:rank:%d" % (n, n % 5 + 1) for n in range(10)]
+    + ["radionet:cities:City%d:az" % n for n in range(5)]
+    + ["radionet:root", "radionet:favorites", "radionet:topstations"]
+    + ["radionet:genres", "radionet:countries", "radionet:localstations:2"]
+)
+
+
+def cascade(uri):
+    category = None
+    value = None
+    page = None
+    sorting = None
+
+    result = re.findall(
+        r"^radionet:(genres|topics|languages|cities|countries)"
+        r"(:([^:]+)(:(rank|az)(:([0-9]+))?)?)?$",
+        uri,
+    )
+    if result:
+        category = result[0][0]
+        value = result[0][2]
+        sorting = result[0][4]
+        page = result[0][6]
+    else:
+        result = re.findall(
+            r"^radionet:(root|favorites|topstations|localstations|station|track)"
+            r"(:([0-9]+))?$",
+            uri,
+        )
+        if result:
+            category = result[0][0]
+            page = result[0][2]
+        else:
+            result = re.findall(r"^radionet:(track):([^:]+)$", uri)
+            if result:
+                category = result[0][0]
+                page = result[0][1]
+    return category, page, value, sorting
+
+
+def per_uri(func):
+    def run():
+        for uri in URIS:
+            func(uri)
+
+    best = min(timeit.repeat(run, number=200, repeat=5))
+    return best / (200 * len(URIS)) * 1e9
+
+
+def main():
+    old = per_uri(cascade)
+    uncached = per_uri(parse_uri.__wrapped__)
+    cached = per_uri(parse_uri)
+    print("URIs in mix:          %d" % len(URIS))
+    print("regex cascade:        %6.0f ns/URI" % old)
+    print("router, uncached:     %6.0f ns/URI" % uncached)
+    print("router, cached:       %6.0f ns/URI" % cached)
+
+
+if __name__ == "__main__":
+    main()
@@ -27,9 +27,40 @@ class Extension(ext.Extension):
         schema["min_bitrate"] = config.String()
         schema["api_key"] = config.String()
         schema["favorite_stations"] = config.List(True)
+        schema["persistent_cache"] = config.Boolean(optional=True)
+        schema["cache_size"] = config.Integer(minimum=0, optional=True)
+        schema["station_cache_size"] = config.Integer(minimum=0, optional=True)
+        schema["max_workers"] = config.Integer(minimum=1)
+        schema["warm_up"] = config.Boolean()
+        schema["connect_timeout"] = config.Float(minimum=0)
+        schema["read_timeout"] = config.Float(minimum=0)
+        schema["retries"] = config.Integer(minimum=0)
+        schema["requests_per_second"] = config.Float(minimum=0)
+        schema["request_burst"] = config.Integer(minimum=1)
+        schema["json_decoder"] = config.String(
+            choices=["auto", "orjson", "ujson", "json"]
+        )
+        schema["search_max_pages"] = config.Integer(minimum=0, optional=True)
+        schema["search_max_results"] = config.Integer(minimum=0, optional=True)
+        schema["local_search"] = config.Boolean()
+        schema["local_search_max_age"] = config.Integer(minimum=0)
+        schema["local_search_min_stations"] = config.Integer(minimum=0, optional=True)
+        schema["prefetch_streams"] = config.Integer(minimum=0)
+        schema["stream_url_ttl"] = config.Integer(minimum=0)
+        schema["probe_streams"] = config.Boolean()
+        schema["probe_timeout"] = config.Float(minimum=0)
+        schema["stream_timeout"] = config.Float(minimum=0)
+        schema["dead_stream_cooldown"] = config.Integer(minimum=0)
         return schema
 
+    def get_command(self):
+        from .commands import RadioNetCommand
+
+        return RadioNetCommand()
+
     def setup(self, registry):
         from .backend import RadioNetBackend
+        from .frontend import RadioNetFrontend
 
         registry.add("backend", RadioNetBackend)
+        registry.add("frontend", RadioNetFrontend)
@@ -1,13 +1,76 @@
 from __future__ import unicode_literals
 
-import re
+import logging
+import os
+import threading
+
 import pykka
 from mopidy import backend
 
 import mopidy_radionet
 
+from .crawler import load_snapshot
+from .index import StationIndex
 from .library import RadioNetLibraryProvider
+from .probe import StreamProber
 from .radionet import RadioNetClient
+from .uri import parse_uri
+
+logger = logging.getLogger(__name__)
+
+
+def create_client(config):
+    client = RadioNetClient(
+        config["proxy"],
+        "%s/%s" % (mopidy_radionet.Extension.dist_name, mopidy_radionet.__version__),
+    )
+
+    client.min_bitrate = int(config["radionet"]["min_bitrate"])
+    client.set_lang(str(config["radionet"]["language"]).strip())
+    client.set_apikey(str(config["radionet"]["api_key"]))
+    client.set_favorites(
+        tuple(
+            file_ext.strip("'").lower() for file_ext in config["radionet"]["favorite_stations"]
+        )
+    )
+    client.set_cache_size(
+        config["radionet"]["cache_size"],
+        config["radionet"]["station_cache_size"],
+    )
+    client.set_max_workers(config["radionet"]["max_workers"])
+    client.set_timeouts(
+        config["radionet"]["connect_timeout"],
+        config["radionet"]["read_timeout"],
+        config["radionet"]["retries"],
+    )
+    client.set_rate_limit(
+        config["radionet"]["requests_per_second"],
+        config["radionet"]["request_burst"],
+    )
+    client.stream_url_ttl = config["radionet"]["stream_url_ttl"]
+    client.dead_stream_cooldown = config["radionet"]["dead_stream_cooldown"]
+    if config["radionet"]["probe_streams"]:
+        client.stream_prober = StreamProber(
+            config["radionet"]["probe_timeout"], config["radionet"]["max_workers"]
+        )
+    client.set_json_decoder(config["radionet"]["json_decoder"])
+    client.search_max_pages = config["radionet"]["search_max_pages"]
+    client.search_max_results = config["radionet"]["search_max_results"]
+    if config["radionet"]["local_search"]:
+        client.station_index = StationIndex()
+        client.local_search_max_age = config["radionet"]["local_search_max_age"]
+        client.local_search_min_stations = config["radionet"][
+            "local_search_min_stations"
+        ]
+    if config["radionet"]["persistent_cache"]:
+        client.set_persistent_cache(
+            os.path.join(mopidy_radionet.Extension.get_cache_dir(config), "cache.sqlite3")
+        )
+    return client
+
+
+def get_snapshot_path(config):
+    return os.path.join(mopidy_radionet.Extension.get_data_dir(config), "catalog.json.gz")
 
 
 class RadioNetBackend(pykka.ThreadingActor, backend.Backend):
@@ -15,34 +78,97 @@ class RadioNetBackend(pykka.ThreadingActor, backend.Backend):
 
     def __init__(self, config, audio):
         super(RadioNetBackend, self).__init__()
-        self.radionet = RadioNetClient(
-            config["proxy"],
-            "%s/%s"
-            % (mopidy_radionet.Extension.dist_name, mopidy_radionet.__version__),
-        )
+        self.radionet = create_client(config)
 
         self.library = RadioNetLibraryProvider(backend=self)
         self.playback = RadioNetPlaybackProvider(audio=audio, backend=self)
 
         self.uri_schemes = ["radionet"]
 
-        self.radionet.min_bitrate = int(config["radionet"]["min_bitrate"])
-        self.radionet.set_lang(str(config["radionet"]["language"]).strip())
-        self.radionet.set_apikey(str(config["radionet"]["api_key"]))
-        self.radionet.set_favorites(
-            tuple(
-                file_ext.strip("'").lower() for file_ext in config["radionet"]["favorite_stations"]
+        self.warm_up = config["radionet"]["warm_up"]
+        self.snapshot_path = get_snapshot_path(config)
+
+    def on_start(self):
+        if self.radionet.station_index is not None:
+            self.radionet.run_in_background(
+                load_snapshot, self.radionet, self.snapshot_path
             )
-        )
+        if self.warm_up:
+            self.radionet.run_in_background(self.radionet.warm_up)
+        elif self.radionet.favorites:
+            self.radionet.run_in_background(self.radionet.get_favorites)
+
+    def prefetch_streams(self, uris):
+        """Resolve the stream URLs of the stations behind ``uris`` in advance."""
+        station_ids = []
+        for uri in uris:
+            parsed = parse_uri(uri)
+            if parsed.category in ["station", "track"] and parsed.identifier:
+                station_ids.append(parsed.identifier)
+        if station_ids:
+            self.radionet.prefetch_stream_urls(station_ids)
+
+    def on_stop(self):
+        if self.radionet.stream_prober is not None:
+            self.radionet.stream_prober.close()
+        if self.radionet.persistent_cache is not None:
+            self.radionet.persistent_cache.close()
 
 
 class RadioNetPlaybackProvider(backend.PlaybackProvider):
+    """Plays radio.net stations from their first stream that is not dead.
+
+    A stream that fails to start, or that the frontend's watchdog reports as
+    stalled through :meth:`fail_stream`, is marked dead. Playing the station
+    again then resolves it to its next stream.
+    """
+
+    def __init__(self, audio, backend):
+        super(RadioNetPlaybackProvider, self).__init__(audio, backend)
+        self._lock = threading.Lock()
+        self._stream_url = None
+        self._candidates = []
+
     def is_live(self, uri):
         return True
 
     def translate_uri(self, uri):
-        identifier = re.findall(r"^radionet:track:?([a-z0-9]+|\d+)?$", uri)
-        if identifier:
-            return self.backend.radionet.get_stream_url(identifier[0])
+        parsed = parse_uri(uri)
+        if parsed.category == "track" and parsed.identifier:
+            stream_urls = self.backend.radionet.get_stream_urls(parsed.identifier)
+            with self._lock:
+                self._stream_url = stream_urls[0] if stream_urls else None
+                self._candidates = stream_urls[1:]
+                return self._stream_url
 
         return None
+
+    def play(self):
+        with self._lock:
+            stream_url = self._stream_url
+        started = super(RadioNetPlaybackProvider, self).play()
+        if not started and stream_url is not None:
+            self.backend.radionet.mark_stream_dead(stream_url)
+        return started
+
+    def fail_stream(self):
+        """Mark the playing stream dead.
+
+        Returns true if the station has another stream to play instead.
+        """
+        with self._lock:
+            if self._stream_url is None:
+                return False
+            self.backend.radionet.mark_stream_dead(self._stream_url)
+            if not self._candidates:
+                logger.warning(
+                    "Radio.net: Stream %s failed, no other streams left",
+                    self._stream_url,
+                )
+                return False
+            logger.info(
+                "Radio.net: Stream %s failed, switching to %s",
+                self._stream_url,
+                self._candidates[0],
+            )
+            return True
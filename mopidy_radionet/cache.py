@@ -0,0 +1,293 @@
+from __future__ import unicode_literals
+
+import logging
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+class CacheItem(object):
+    """A cached value that expires after ``expires`` minutes.
+
+    ``validators`` holds the ``etag`` and ``last-modified`` headers of the
+    response the value was built from, if the API sent any.
+    """
+
+    def __init__(self, value, expires=10, expires_at=None, validators=None):
+        self._value = value
+        if expires_at is None:
+            expires_at = time.time() + expires * 60
+        self._expires = expires_at
+        self.validators = validators
+
+    def expired(self, grace=0):
+        return self._expires + grace < time.time()
+
+    def expires_at(self):
+        return self._expires
+
+    def value(self):
+        return self._value
+
+
+class LRUCache(object):
+    """Size bounded mapping that evicts the least recently used entries.
+
+    :class:`CacheItem` values that expired more than ``stale_time`` seconds
+    ago are purged at most once every ``purge_interval`` seconds when new
+    entries are stored.
+    """
+
+    def __init__(self, max_size=1000, purge_interval=60, stale_time=0):
+        self.max_size = max_size
+        self.purge_interval = purge_interval
+        self.stale_time = stale_time
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._items = OrderedDict()
+        self._lock = threading.RLock()
+        self._purged = time.time()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._items[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def __getitem__(self, key):
+        with self._lock:
+            value = self._items[key]
+            self._items.move_to_end(key)
+            return value
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            if self._purged + self.purge_interval < time.time():
+                self.purge_expired()
+            self._evict()
+
+    def __delitem__(self, key):
+        with self._lock:
+            del self._items[key]
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._items
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._items.pop(key, default)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def resize(self, max_size):
+        with self._lock:
+            self.max_size = max_size
+            self._evict()
+
+    def purge_expired(self):
+        with self._lock:
+            expired = [
+                key
+                for key, value in self._items.items()
+                if isinstance(value, CacheItem) and value.expired(self.stale_time)
+            ]
+            for key in expired:
+                del self._items[key]
+            self.expirations += len(expired)
+            self._purged = time.time()
+            return len(expired)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._items),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def _evict(self):
+        while self.max_size and len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+            self.evictions += 1
+
+
+class SingleFlight(object):
+    """Merges concurrent calls for the same key into a single call."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def running(self, key):
+        with self._lock:
+            return key in self._calls
+
+    def do(self, key, func, *args):
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                owner = False
+            else:
+                owner = True
+                future = self._calls[key] = Future()
+
+        if not owner:
+            return future.result()
+
+        try:
+            result = func(*args)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class PersistentCache(object):
+    """SQLite backed store for :class:`CacheItem` objects.
+
+    The database is opened on first use, so creating the store is cheap even
+    when the cache is never read. Writes are committed in batches by a timer
+    thread at most ``commit_delay`` seconds later, and on :meth:`close`.
+    Entries that expired more than ``stale_time`` seconds ago are deleted when
+    the database is opened and at most once every ``purge_interval`` seconds.
+    """
+
+    def __init__(self, path, stale_time=0, commit_delay=5, purge_interval=3600):
+        self.path = str(path)
+        self.stale_time = stale_time
+        self.commit_delay = commit_delay
+        self.purge_interval = purge_interval
+        self._connection = None
+        self._commit_timer = None
+        self._last_purge = 0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache "
+                "(key TEXT PRIMARY KEY, expires REAL, value BLOB, validators BLOB)"
+            )
+            columns = [
+                row[1] for row in self._connection.execute("PRAGMA table_info(cache)")
+            ]
+            if "validators" not in columns:
+                self._connection.execute("ALTER TABLE cache ADD COLUMN validators BLOB")
+            self._purge()
+            self._connection.commit()
+        return self._connection
+
+    def _purge(self):
+        deleted = self._connection.execute(
+            "DELETE FROM cache WHERE expires < ?", (time.time() - self.stale_time,)
+        ).rowcount
+        self._last_purge = time.time()
+        if deleted:
+            logger.debug("Radio.net: Purged %d expired cache entries", deleted)
+
+    def get(self, key):
+        with self._lock:
+            try:
+                # fetchall finishes the statement, so no read lock is held
+                rows = (
+                    self._connect()
+                    .execute(
+                        "SELECT expires, value, validators FROM cache WHERE key = ?",
+                        (key,),
+                    )
+                    .fetchall()
+                )
+                if not rows:
+                    return None
+                row = rows[0]
+                return CacheItem(
+                    pickle.loads(row[1]),
+                    expires_at=row[0],
+                    validators=pickle.loads(row[2]) if row[2] else None,
+                )
+            except (
+                sqlite3.Error,
+                pickle.PickleError,
+                EOFError,
+                AttributeError,
+                TypeError,
+            ) as e:
+                logger.warning("Radio.net: Unable to read cache entry %s: %s", key, e)
+                return None
+
+    def set(self, key, item):
+        with self._lock:
+            try:
+                connection = self._connect()
+                connection.execute(
+                    "INSERT OR REPLACE INTO cache (key, expires, value, validators) "
+                    "VALUES (?, ?, ?, ?)",
+                    (
+                        key,
+                        item.expires_at(),
+                        pickle.dumps(item.value()),
+                        pickle.dumps(item.validators) if item.validators else None,
+                    ),
+                )
+            except (sqlite3.Error, pickle.PickleError) as e:
+                logger.warning("Radio.net: Unable to write cache entry %s: %s", key, e)
+                return
+            if self._commit_timer is None:
+                self._commit_timer = threading.Timer(self.commit_delay, self.flush)
+                self._commit_timer.daemon = True
+                self._commit_timer.start()
+
+    def flush(self):
+        """Commit pending writes, purging expired entries now and then."""
+        with self._lock:
+            self._commit()
+
+    def _commit(self):
+        timer, self._commit_timer = self._commit_timer, None
+        if timer is not None:
+            timer.cancel()
+        if self._connection is None:
+            return
+        try:
+            if time.time() - self._last_purge > self.purge_interval:
+                self._purge()
+            self._connection.commit()
+        except sqlite3.Error as e:
+            logger.warning("Radio.net: Unable to write cache: %s", e)
+
+    def close(self):
+        with self._lock:
+            self._commit()
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
@@ -0,0 +1,51 @@
+from __future__ import unicode_literals
+
+import logging
+
+from mopidy import commands
+
+from .backend import create_client, get_snapshot_path
+from .crawler import CatalogCrawler, read_snapshot, write_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+class RadioNetCommand(commands.Command):
+    def __init__(self):
+        super(RadioNetCommand, self).__init__()
+        self.add_child("crawl", CrawlCommand())
+
+
+class CrawlCommand(commands.Command):
+    help = "Snapshot the radio.net catalog for local search."
+
+    def __init__(self):
+        super(CrawlCommand, self).__init__()
+        self.add_argument(
+            "--full",
+            action="store_true",
+            dest="full",
+            default=False,
+            help="Refetch every category instead of only changed ones",
+        )
+        self.add_argument(
+            "--rate",
+            type=float,
+            dest="rate",
+            default=5,
+            help="Maximum number of requests per second",
+        )
+
+    def run(self, args, config):
+        client = create_client(config)
+        path = get_snapshot_path(config)
+
+        previous = None if args.full else read_snapshot(path)
+        snapshot = CatalogCrawler(client, args.rate).crawl(previous)
+        if not snapshot["stations"]:
+            logger.error("Radio.net: Crawl found no stations, keeping old snapshot")
+            return 1
+
+        write_snapshot(snapshot, path)
+        logger.info("Radio.net: Catalog snapshot written to %s", path)
+        return 0
@@ -0,0 +1,204 @@
+from __future__ import unicode_literals
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from .radionet import Station, _intern
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+STATION_FIELDS = (
+    "id",
+    "slug",
+    "name",
+    "continent",
+    "country",
+    "city",
+    "genres",
+    "description",
+    "image_tiny",
+    "image_small",
+    "image_medium",
+    "image_large",
+)
+
+
+def read_snapshot(path):
+    """Read a catalog snapshot, or return None if it is missing or outdated."""
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as fh:
+            snapshot = json.load(fh)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning("Radio.net: Unable to read catalog snapshot %s: %s", path, e)
+        return None
+
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        logger.info("Radio.net: Ignoring outdated catalog snapshot %s", path)
+        return None
+    return snapshot
+
+
+def write_snapshot(snapshot, path):
+    tmp_path = str(path) + ".tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as fh:
+        json.dump(snapshot, fh, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(client, path):
+    """Add the stations of a catalog snapshot to the client's station index.
+
+    Snapshot stations only go into the index, stations the client already
+    indexed from live responses are kept as they are.
+    """
+    snapshot = read_snapshot(path)
+    if snapshot is None or client.station_index is None:
+        return 0
+
+    for record in snapshot["stations"]:
+        if record[0] in client.station_index:
+            continue
+        station = Station(record[0])
+        station.playable = True
+        for field, value in zip(STATION_FIELDS[1:], record[1:]):
+            setattr(station, field, _intern(value))
+        client.station_index.add(station)
+    client.station_index.mark_seeded(snapshot["created"])
+
+    logger.info(
+        "Radio.net: Loaded %d stations from catalog snapshot", len(snapshot["stations"])
+    )
+    return len(snapshot["stations"])
+
+
+class CatalogCrawler(object):
+    """Walks every page of every genre, topic, language, city and country.
+
+    Category pages are crawled on the client's worker pool, with the client's
+    rate limit set to ``requests_per_second``. When a previous snapshot is
+    given, a category whose first page and page count are unchanged is taken
+    over from it without fetching its other pages.
+    """
+
+    def __init__(self, client, requests_per_second=5):
+        self.client = client
+        self.client.set_rate_limit(requests_per_second)
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def crawl(self, previous=None):
+        previous_categories = previous["categories"] if previous else {}
+        previous_stations = {}
+        if previous:
+            previous_stations = {record[0]: record for record in previous["stations"]}
+
+        targets = []
+        for category in self.client.category_param_map:
+            for item in self.client._get_items(category) or []:
+                targets.append((category, item["systemEnglish"]))
+
+        logger.info("Radio.net: Crawling %d categories", len(targets))
+        results = self.client._map(
+            lambda target: self._crawl_category(
+                target[0], target[1], previous_categories.get("/".join(target))
+            ),
+            targets,
+        )
+
+        categories = {}
+        stations = {}
+        reused = 0
+        for key, entry, records in results:
+            if entry is None:
+                continue
+            categories[key] = entry
+            if records is None:
+                reused += 1
+                records = [
+                    previous_stations[station_id]
+                    for station_id in entry["stations"]
+                    if station_id in previous_stations
+                ]
+            for record in records:
+                stations.setdefault(record[0], record)
+
+        logger.info(
+            "Radio.net: Crawled %d stations in %d categories "
+            "(%d unchanged) with %d requests",
+            len(stations),
+            len(categories),
+            reused,
+            self.requests,
+        )
+        return {
+            "version": SNAPSHOT_VERSION,
+            "created": time.time(),
+            "api": self.client.api_prefix,
+            "categories": categories,
+            "stations": list(stations.values()),
+        }
+
+    def _crawl_category(self, category, value, previous_entry):
+        key = category + "/" + value
+        result = self._get_page(category, value, 1)
+        if result is None:
+            return key, previous_entry, None
+
+        number_pages = int(result["numberPages"])
+        matches = list(result["categories"][0]["matches"]) if number_pages else []
+        signature = hashlib.sha1(
+            (
+                str(number_pages)
+                + ":"
+                + ",".join(str(match["id"]) for match in matches)
+            ).encode("utf-8")
+        ).hexdigest()
+        if previous_entry is not None and previous_entry["hash"] == signature:
+            return key, previous_entry, None
+
+        complete = True
+        for page in range(2, number_pages + 1):
+            result = self._get_page(category, value, page)
+            if result is None:
+                complete = False
+            else:
+                matches.extend(result["categories"][0]["matches"])
+        if not complete:
+            # without a hash the category is crawled in full again next time
+            logger.warning("Radio.net: Crawl of %s is incomplete", key)
+            signature = None
+
+        records = []
+        for match in matches:
+            station = self.client._get_station_from_search_result(match)
+            record = [getattr(station, field) for field in STATION_FIELDS]
+            if category == "genres" and not station.genres:
+                # search results carry no genres, the record gets the crawled one
+                record[STATION_FIELDS.index("genres")] = value
+            records.append(record)
+
+        entry = {
+            "pages": number_pages,
+            "hash": signature,
+            "stations": [record[0] for record in records],
+        }
+        return key, entry, records
+
+    def _get_page(self, category, value, page):
+        with self._lock:
+            self.requests += 1
+        param = self.client.category_param_map[category]
+        return self.client._get_json(
+            "/search/stationsby" + param,
+            {param: value, "sorttype": "RANK", "sizeperpage": 50, "pageindex": page},
+            "Error on crawl of " + category + "/" + value,
+        )
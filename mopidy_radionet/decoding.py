@@ -0,0 +1,78 @@
+from __future__ import unicode_literals
+
+import json
+import logging
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+logger = logging.getLogger(__name__)
+
+DECODERS = {"json": json.loads}
+if ujson is not None:
+    DECODERS["ujson"] = ujson.loads
+if orjson is not None:
+    DECODERS["orjson"] = orjson.loads
+
+
+def get_decoder(name="auto"):
+    """Return the ``loads`` function of the JSON library called ``name``.
+
+    ``auto`` picks the fastest installed one of orjson, ujson and the
+    standard library. Libraries that are not installed fall back to the
+    standard library.
+    """
+    if name == "auto":
+        for name in ("orjson", "ujson", "json"):
+            if name in DECODERS:
+                return DECODERS[name]
+    if name not in DECODERS:
+        logger.warning("Radio.net: %s is not installed, using json instead", name)
+        return json.loads
+    return DECODERS[name]
+
+
+def _value(field):
+    if field is None:
+        return ""
+    return field["value"]
+
+
+def project_match(match):
+    """Return the fields of a search result that a station is built from.
+
+    The fields come in the order of :data:`MATCH_FIELDS`, after the
+    station id. Search results carry many more fields, which are skipped.
+    """
+    return (
+        match["id"],
+        _value(match["continent"]),
+        _value(match["country"]),
+        _value(match["city"]),
+        _value(match["name"]),
+        _value(match["subdomain"]),
+        _value(match["shortDescription"]),
+        match["logo44x44"],
+        match["logo100x100"],
+        match["logo175x175"],
+    )
+
+
+MATCH_FIELDS = (
+    "continent",
+    "country",
+    "city",
+    "name",
+    "slug",
+    "description",
+    "image_tiny",
+    "image_small",
+    "image_medium",
+)
@@ -0,0 +1,78 @@
+from __future__ import unicode_literals
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class StreamWatchdog(object):
+    """Replays a radio.net track on its next stream when the current one stalls.
+
+    While core is playing a watched track, its time position is polled. When
+    it does not advance for ``stream_timeout`` seconds, ``fail_stream`` is
+    called to mark the playing stream dead. If it returns true, the track is
+    played again through core, which resolves it to the station's next stream.
+
+    Watching ends as soon as core is no longer playing the same track, so a
+    stream that ended, was paused or was stopped is left to core.
+    """
+
+    poll_interval = 1
+
+    def __init__(self, core, fail_stream, stream_timeout=5):
+        self.core = core
+        self.fail_stream = fail_stream
+        self.stream_timeout = stream_timeout
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    def watch(self, tl_track):
+        generation = self.cancel()
+        if self.stream_timeout:
+            threading.Thread(
+                target=self._watch,
+                args=(tl_track.tlid, generation),
+                name="RadioNetFailover",
+                daemon=True,
+            ).start()
+
+    def cancel(self):
+        with self._lock:
+            self._generation += 1
+            return self._generation
+
+    def _is_current(self, generation):
+        with self._lock:
+            return generation == self._generation
+
+    def _is_playing(self, tlid):
+        playback = self.core.playback
+        return (
+            playback.get_state().get() == "playing"
+            and playback.get_current_tlid().get() == tlid
+        )
+
+    def _watch(self, tlid, generation):
+        deadline = time.time() + self.stream_timeout
+        position = 0
+        while True:
+            time.sleep(self.poll_interval)
+            if not self._is_current(generation) or not self._is_playing(tlid):
+                return
+
+            current_position = self.core.playback.get_time_position().get()
+            if current_position > position:
+                position = current_position
+                deadline = time.time() + self.stream_timeout
+            elif time.time() >= deadline:
+                self._failover(tlid, generation)
+                return
+
+    def _failover(self, tlid, generation):
+        if not self.fail_stream():
+            return
+        # the track may have been changed while the stream was marked dead
+        if self._is_current(generation) and self._is_playing(tlid):
+            self.core.playback.play(tlid=tlid)
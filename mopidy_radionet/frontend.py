@@ -0,0 +1,86 @@
+from __future__ import unicode_literals
+
+import logging
+
+import pykka
+from mopidy import core
+
+from .backend import RadioNetBackend
+from .failover import StreamWatchdog
+
+logger = logging.getLogger(__name__)
+
+
+class RadioNetFrontend(pykka.ThreadingActor, core.CoreListener):
+    """Prefetches stream URLs of radio.net stations in the tracklist.
+
+    The first ``prefetch_streams`` stations added to the tracklist and as many
+    entries after the current track are handed to the backend, which resolves
+    their stream URLs in the background before they are played.
+
+    Playing stations are watched by a :class:`StreamWatchdog`, which switches
+    stalled stations to their next stream through core.
+    """
+
+    def __init__(self, config, core):
+        super(RadioNetFrontend, self).__init__()
+        self.core = core
+        self.prefetch_streams = config["radionet"]["prefetch_streams"]
+        self.watchdog = StreamWatchdog(
+            core, self._fail_stream, config["radionet"]["stream_timeout"]
+        )
+        self._tlids = set()
+
+    def on_stop(self):
+        self.watchdog.cancel()
+
+    def tracklist_changed(self):
+        if not self.prefetch_streams:
+            return
+        tl_tracks = self.core.tracklist.get_tl_tracks().get()
+        added = [tl_track for tl_track in tl_tracks if tl_track.tlid not in self._tlids]
+        self._tlids = set(tl_track.tlid for tl_track in tl_tracks)
+        self._prefetch(added[: self.prefetch_streams] + self._upcoming(tl_tracks))
+
+    def track_playback_started(self, tl_track):
+        self._watch(tl_track)
+        if not self.prefetch_streams:
+            return
+        self._prefetch(self._upcoming(self.core.tracklist.get_tl_tracks().get()))
+
+    def track_playback_resumed(self, tl_track, time_position):
+        self._watch(tl_track)
+
+    def track_playback_paused(self, tl_track, time_position):
+        self.watchdog.cancel()
+
+    def track_playback_ended(self, tl_track, time_position):
+        self.watchdog.cancel()
+
+    def _watch(self, tl_track):
+        if tl_track.track.uri.startswith("radionet:"):
+            self.watchdog.watch(tl_track)
+        else:
+            self.watchdog.cancel()
+
+    def _fail_stream(self):
+        failed = False
+        for backend in pykka.ActorRegistry.get_by_class(RadioNetBackend):
+            failed = backend.proxy().playback.fail_stream().get() or failed
+        return failed
+
+    def _upcoming(self, tl_tracks):
+        index = self.core.tracklist.index().get()
+        start = 0 if index is None else index + 1
+        return tl_tracks[start : start + self.prefetch_streams]
+
+    def _prefetch(self, tl_tracks):
+        uris = [
+            tl_track.track.uri
+            for tl_track in tl_tracks
+            if tl_track.track.uri.startswith("radionet:")
+        ]
+        if not uris:
+            return
+        for backend in pykka.ActorRegistry.get_by_class(RadioNetBackend):
+            backend.proxy().prefetch_streams(uris)
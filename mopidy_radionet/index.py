@@ -0,0 +1,131 @@
+from __future__ import unicode_literals
+
+import bisect
+import re
+import threading
+import time
+import unicodedata
+
+_word_re = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text):
+    """Split ``text`` into lower case tokens without diacritics."""
+    if not text:
+        return []
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _word_re.findall(text)
+
+
+class StationIndex(object):
+    """In-memory full-text index over the stations seen by the client.
+
+    Stations are indexed by the words of their name, city, country, genres
+    and description. Every query word matches index words it is a prefix of,
+    and all query words have to match.
+
+    The index keeps every station it is given until it is dropped, it is not
+    bounded. Filled from a catalog snapshot it holds the whole radio.net
+    directory.
+    """
+
+    def __init__(self):
+        self.seeded_at = None
+        self._stations = {}
+        self._station_tokens = {}
+        self._postings = {}
+        self._sorted_tokens = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._stations)
+
+    def __contains__(self, station_id):
+        with self._lock:
+            return station_id in self._stations
+
+    def add(self, station):
+        tokens = set()
+        for field in (
+            station.name,
+            station.city,
+            station.country,
+            station.genres,
+            station.description,
+        ):
+            tokens.update(tokenize(field))
+        tokens = frozenset(tokens)
+
+        with self._lock:
+            self._stations[station.id] = station
+            old_tokens = self._station_tokens.get(station.id, frozenset())
+            if old_tokens == tokens:
+                return
+            self._station_tokens[station.id] = tokens
+
+            for token in old_tokens - tokens:
+                postings = self._postings[token]
+                postings.discard(station.id)
+                if not postings:
+                    del self._postings[token]
+                    del self._sorted_tokens[
+                        bisect.bisect_left(self._sorted_tokens, token)
+                    ]
+            for token in tokens - old_tokens:
+                postings = self._postings.get(token)
+                if postings is None:
+                    postings = self._postings[token] = set()
+                    bisect.insort(self._sorted_tokens, token)
+                postings.add(station.id)
+
+    def search(self, query, max_results=None):
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        with self._lock:
+            matches = None
+            for term in terms:
+                ids = set()
+                for token in self._tokens_with_prefix(term):
+                    ids.update(self._postings[token])
+                matches = ids if matches is None else matches & ids
+                if not matches:
+                    return []
+            stations = [self._stations[station_id] for station_id in matches]
+
+        def rank(station):
+            name_tokens = tokenize(station.name)
+            in_name = sum(
+                1
+                for term in terms
+                if any(token.startswith(term) for token in name_tokens)
+            )
+            return -in_name, station.name or ""
+
+        stations = sorted((s for s in stations if s.playable), key=rank)
+        if max_results:
+            stations = stations[:max_results]
+        return stations
+
+    def _tokens_with_prefix(self, prefix):
+        tokens = self._sorted_tokens
+        position = bisect.bisect_left(tokens, prefix)
+        while position < len(tokens) and tokens[position].startswith(prefix):
+            yield tokens[position]
+            position += 1
+
+    def mark_seeded(self, seeded_at=None):
+        self.seeded_at = time.time() if seeded_at is None else seeded_at
+
+    def is_fresh(self, max_age, min_stations=None):
+        """Tell whether searches can be answered from the index alone.
+
+        That is the case when it was seeded less than ``max_age`` minutes ago,
+        or holds at least ``min_stations`` stations.
+        """
+        if self.seeded_at is not None and self.seeded_at + max_age * 60 > time.time():
+            return True
+        return bool(min_stations) and len(self) >= min_stations
@@ -1,11 +1,13 @@
 from __future__ import unicode_literals
 
 import logging
-import re
 
 from mopidy import backend
 from mopidy.models import Album, Artist, Ref, SearchResult, Track, Image
 
+from .cache import LRUCache
+from .uri import parse_uri
+
 
 logger = logging.getLogger(__name__)
 
@@ -15,56 +17,56 @@ class RadioNetLibraryProvider(backend.LibraryProvider):
 
     def __init__(self, backend):
         super().__init__(backend)
+        self._models = LRUCache(20000)
 
     def lookup(self, uri):
 
         if not uri.startswith("radionet:"):
             return None
 
-        variant, identifier, sorting, page = self.parse_uri(uri)
-
-        if variant == "station" or variant == "track":
-            try:
-                identifier = int(identifier)
-                radio_data = self.backend.radionet.get_station_by_id(identifier)
-            except ValueError:
-                radio_data = self.backend.radionet.get_station_by_slug(identifier)
-
-            artist = Artist(name=radio_data.name)
-
-            name = ""
-            if radio_data.description is not None:
-                name = radio_data.description + " / "
-            name = (
-                name
-                + radio_data.continent
-                + " / "
-                + radio_data.country
-                + " - "
-                + radio_data.city
-            )
-
-            album = Album(
-                artists=[artist],
-                name=name,
-                uri="radionet:station:%s" % radio_data.id,
-            )
+        identifier = self._station_identifiers([uri]).get(uri)
+        if identifier is None:
+            return []
+        station = self.backend.radionet.get_stations([identifier]).get(identifier)
+        return [self._station_to_lookup_track(station)] if station else []
+
+    def _station_to_lookup_track(self, station):
+        return self._get_model("lookup", station, self._build_lookup_track)
+
+    def _build_lookup_track(self, radio_data):
+        artist = Artist(name=radio_data.name)
+
+        name = ""
+        if radio_data.description is not None:
+            name = radio_data.description + " / "
+        name = (
+            name
+            + radio_data.continent
+            + " / "
+            + radio_data.country
+            + " - "
+            + radio_data.city
+        )
 
-            track = Track(
-                artists=[artist],
-                album=album,
-                name=radio_data.name,
-                genre=radio_data.genres,
-                comment=radio_data.description,
-                uri="radionet:track:%s" % radio_data.id,
-            )
-            return [track]
+        album = Album(
+            artists=[artist],
+            name=name,
+            uri="radionet:station:%s" % radio_data.id,
+        )
 
-        return []
+        track = Track(
+            artists=[artist],
+            album=album,
+            name=radio_data.name,
+            genre=radio_data.genres,
+            comment=radio_data.description,
+            uri="radionet:track:%s" % radio_data.id,
+        )
+        return track
 
     def browse(self, uri):
 
-        category, page, value, sorting = self.parse_uri(uri)
+        category, value, sorting, page, identifier = parse_uri(uri)
 
         if category == "root":
             return self._browse_root()
@@ -77,22 +79,24 @@ class RadioNetLibraryProvider(backend.LibraryProvider):
             return []
 
     def get_images(self, uris):
+        identifiers = self._station_identifiers(uris)
+        stations = self.backend.radionet.get_stations(identifiers.values())
+
         images = {}
-        for uri in uris:
-            variant, identifier, sorting, page = self.parse_uri(uri)
-            station = self.backend.radionet.get_station_by_id(identifier)
+        for uri, identifier in identifiers.items():
+            station = stations.get(identifier)
             if station:
-                images[uri] = []
-                if station.image_tiny:
-                    images[uri].append(Image(uri=station.image_tiny, height=44, width=44))
-                if station.image_small:
-                    images[uri].append(Image(uri=station.image_small, height=100, width=100))
-                if station.image_medium:
-                    images[uri].append(Image(uri=station.image_medium, height=175, width=175))
-                if station.image_large:
-                    images[uri].append(Image(uri=station.image_large, height=300, width=300))
+                images[uri] = self.station_to_images(station)
         return images
 
+    def _station_identifiers(self, uris):
+        identifiers = {}
+        for uri in uris:
+            identifier = parse_uri(uri).identifier
+            if identifier:
+                identifiers[uri] = identifier
+        return identifiers
+
     def _browse_root(self):
         directories = [
             self.ref_directory("radionet:topstations", "Top stations"),
@@ -226,20 +230,45 @@ class RadioNetLibraryProvider(backend.LibraryProvider):
         if "any" not in query:
             return None
 
-        result = []
+        radionet = self.backend.radionet
+        query_string = " ".join(query["any"])
+        index = radionet.station_index
 
-        for station in self.backend.radionet.do_search(" ".join(query["any"])):
+        use_index = index is not None and (
+            not radionet.is_api_available()
+            or index.is_fresh(
+                radionet.local_search_max_age, radionet.local_search_min_stations
+            )
+        )
+        stations = []
+        if use_index:
+            stations = index.search(query_string, radionet.search_max_results)
+        if not stations:
+            stations = list(
+                radionet.iter_search(query_string, radionet.search_max_results)
+            )
+            if not stations and index is not None and not use_index:
+                stations = index.search(query_string, radionet.search_max_results)
+
+        result = []
+        for station in stations:
             result.append(self.station_to_track(station))
 
         return SearchResult(tracks=result)
 
     def station_to_ref(self, station):
+        return self._get_model("ref", station, self._build_ref)
+
+    def _build_ref(self, station):
         return Ref.track(
             uri="radionet:station:%s" % station.id,
             name=station.name,
         )
 
     def station_to_track(self, station):
+        return self._get_model("track", station, self._build_track)
+
+    def _build_track(self, station):
         ref = self.station_to_ref(station)
         return Track(
             uri=ref.uri,
@@ -248,47 +277,50 @@ class RadioNetLibraryProvider(backend.LibraryProvider):
             artists=[Artist(uri=ref.uri, name=ref.name)],
         )
 
+    def station_to_images(self, station):
+        return list(self._get_model("images", station, self._build_images))
+
+    def _build_images(self, station):
+        images = []
+        if station.image_tiny:
+            images.append(Image(uri=station.image_tiny, height=44, width=44))
+        if station.image_small:
+            images.append(Image(uri=station.image_small, height=100, width=100))
+        if station.image_medium:
+            images.append(Image(uri=station.image_medium, height=175, width=175))
+        if station.image_large:
+            images.append(Image(uri=station.image_large, height=300, width=300))
+        return tuple(images)
+
+    def _get_model(self, kind, station, build):
+        """Return the model ``build`` makes for ``station``, built only once.
+
+        Models are kept per station id and rebuilt when the station's data
+        changes.
+        """
+        signature = (
+            station.name,
+            station.description,
+            station.continent,
+            station.country,
+            station.city,
+            station.genres,
+            station.image_tiny,
+            station.image_small,
+            station.image_medium,
+            station.image_large,
+        )
+        key = (kind, station.id)
+        cached = self._models.get(key)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        model = build(station)
+        self._models[key] = (signature, model)
+        return model
+
     def ref_directory(self, uri, name):
         return Ref.directory(uri=uri, name=name)
 
     def ref_track(self, uri, name):
         return Ref.track(uri=uri, name=name)
-
-    def parse_uri(self, uri):
-        category = None
-        value = None
-        page = None
-        sorting = None
-
-        result = re.findall(
-            r"^radionet:(genres|topics|languages|cities|countries)(:([^:]+)(:(rank|az)(:([0-9]+))?)?)?$",
-            uri,
-        )
-
-        if result:
-            category = result[0][0]
-            value = result[0][2]
-            sorting = result[0][4]
-            page = result[0][6]
-
-        else:
-            result = re.findall(
-                r"^radionet:(root|favorites|topstations|localstations|station|track)(:([0-9]+))?$",
-                uri,
-            )
-
-            if result:
-                category = result[0][0]
-                page = result[0][2]
-
-            else:
-                result = re.findall(
-                    r"^radionet:(track):([^:]+)$",
-                    uri,
-                )
-
-                if result:
-                    category = result[0][0]
-                    page = result[0][1]
-
-        return category, page, value, sorting
@@ -0,0 +1,171 @@
+from __future__ import unicode_literals
+
+import http.client
+import logging
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urljoin, urlsplit
+
+logger = logging.getLogger(__name__)
+
+StreamProbe = namedtuple(
+    "StreamProbe",
+    ["url", "bit_rate", "healthy", "connect_time", "first_byte_time", "content_type"],
+)
+StreamProbe.__doc__ = """Result of probing a stream URL.
+
+``connect_time`` and ``first_byte_time`` are seconds since the probe started,
+None if the probe did not get that far.
+"""
+
+_redirect_statuses = (301, 302, 303, 307, 308)
+
+
+def probe_stream(url, bit_rate=0, timeout=3, max_redirects=3):
+    """Open ``url`` and time the connection and the first byte of audio."""
+    started = time.time()
+    connect_time = None
+    target = url
+    for _ in range(max_redirects + 1):
+        parts = urlsplit(target)
+        if parts.scheme == "https":
+            connection = http.client.HTTPSConnection(
+                parts.hostname, parts.port, timeout=timeout
+            )
+        elif parts.scheme == "http":
+            connection = http.client.HTTPConnection(
+                parts.hostname, parts.port, timeout=timeout
+            )
+        else:
+            break
+
+        try:
+            connection.connect()
+            if connect_time is None:
+                connect_time = time.time() - started
+            path = parts.path or "/"
+            if parts.query:
+                path += "?" + parts.query
+            connection.request("GET", path, headers={"Icy-MetaData": "0"})
+            response = connection.getresponse()
+
+            location = response.getheader("location")
+            if response.status in _redirect_statuses and location:
+                target = urljoin(target, location)
+                continue
+
+            content_type = response.getheader("content-type", "")
+            healthy = (
+                response.status == 200
+                and not content_type.startswith("text/html")
+                and len(response.read(1)) == 1
+            )
+            return StreamProbe(
+                url,
+                bit_rate,
+                healthy,
+                connect_time,
+                time.time() - started,
+                content_type,
+            )
+        except http.client.BadStatusLine as e:
+            # SHOUTcast v1 servers answer with "ICY 200 OK" instead of HTTP
+            if str(e.line).startswith("ICY 200"):
+                return StreamProbe(
+                    url, bit_rate, True, connect_time, time.time() - started, None
+                )
+            break
+        except (OSError, http.client.HTTPException) as e:
+            logger.debug("Radio.net: Probe of %s failed: %s", url, e)
+            break
+        finally:
+            connection.close()
+
+    return StreamProbe(url, bit_rate, False, connect_time, None, None)
+
+
+def rank_streams(probes, min_bitrate=0):
+    """Order probes by health, then bitrate preference, then latency."""
+
+    def key(probe):
+        latency = probe.first_byte_time
+        if latency is None:
+            latency = float("inf")
+        return not probe.healthy, probe.bit_rate < min_bitrate, latency
+
+    return sorted(probes, key=key)
+
+
+class StreamProber(object):
+    """Probes the stream URLs of a station concurrently and ranks them.
+
+    Probes run on the prober's own thread pool, so they can be started from
+    the client's worker pool.
+    """
+
+    def __init__(self, timeout=3, max_workers=4):
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="RadioNetProbe"
+                )
+            return self._executor
+
+    def probe(self, streams):
+        """Start probing ``streams``, pairs of URL and bitrate."""
+        return [
+            self._get_executor().submit(probe_stream, url, bit_rate, self.timeout)
+            for url, bit_rate in streams
+        ]
+
+    def rank(self, streams, min_bitrate=0):
+        """Probe ``streams``, pairs of URL and bitrate, and rank the results."""
+        futures = self.probe(streams)
+        return rank_streams([future.result() for future in futures], min_bitrate)
+
+    def find(self, streams, min_bitrate=0, callback=None):
+        """Return the first healthy stream of at least ``min_bitrate``.
+
+        Returns as soon as such a probe completes, which is the fastest one.
+        When no stream qualifies, the best healthy stream is returned once all
+        probes finished, or None. The other probes keep running, and
+        ``callback`` is called with the full ranking when they are done.
+        """
+        futures = self.probe(streams)
+        if callback is not None:
+            pending = [len(futures)]
+            lock = threading.Lock()
+
+            def done(future):
+                with lock:
+                    pending[0] -= 1
+                    if pending[0]:
+                        return
+                callback(rank_streams([f.result() for f in futures], min_bitrate))
+
+            for future in futures:
+                future.add_done_callback(done)
+
+        for future in as_completed(futures):
+            probe = future.result()
+            if probe.healthy and probe.bit_rate >= min_bitrate:
+                return probe
+
+        ranking = rank_streams([future.result() for future in futures], min_bitrate)
+        if ranking and ranking[0].healthy:
+            return ranking[0]
+        return None
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
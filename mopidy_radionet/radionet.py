@@ -3,47 +3,202 @@
 from __future__ import unicode_literals
 
 import logging
+import random
+import sys
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import urlencode
 
 import requests
 from mopidy import httpclient
+from requests.adapters import HTTPAdapter
+
+from .cache import CacheItem, LRUCache, PersistentCache, SingleFlight
+from .decoding import MATCH_FIELDS, get_decoder, project_match
+from .ratelimit import BACKGROUND, INTERACTIVE, RateLimiter, parse_retry_after
 
 logger = logging.getLogger(__name__)
 
+# returned by conditional requests when the cached value is still current
+NOT_MODIFIED = object()
+
 
 class Station(object):
-    id = None
-    continent = None
-    country = None
-    city = None
-    genres = None
-    name = None
-    stream_url = None
-    image_tiny = None
-    image_small = None
-    image_medium = None
-    image_large = None
-    description = None
-    playable = False
+    """A radio.net station.
+
+    The logo URLs of a station only differ in their size part, so they are
+    stored once as a prefix, a suffix and the interned size parts. The
+    preferred stream URL is the first of ``streams``.
+    """
+
+    __slots__ = (
+        "id",
+        "slug",
+        "continent",
+        "country",
+        "city",
+        "genres",
+        "name",
+        "streams",
+        "_image_prefix",
+        "_image_suffix",
+        "_image_parts",
+        "description",
+        "playable",
+    )
+
+    def __init__(self, station_id=None):
+        self.id = station_id
+        self.slug = None
+        self.continent = None
+        self.country = None
+        self.city = None
+        self.genres = None
+        self.name = None
+        self.streams = ()
+        self._image_prefix = None
+        self._image_suffix = None
+        self._image_parts = _no_images
+        self.description = None
+        self.playable = False
+
+    @property
+    def stream_url(self):
+        streams = getattr(self, "streams", ())
+        return streams[0][0] if streams else None
+
+    @stream_url.setter
+    def stream_url(self, stream_url):
+        streams = getattr(self, "streams", ())
+        others = tuple(stream for stream in streams if stream[0] != stream_url)
+        first = [stream for stream in streams if stream[0] == stream_url]
+        if stream_url is None:
+            self.streams = others
+        else:
+            self.streams = (first[0] if first else (stream_url, 0),) + others
+
+    @property
+    def images(self):
+        """The tiny, small, medium and large logo URLs."""
+        parts = getattr(self, "_image_parts", _no_images)
+        return tuple(
+            None if part is None else self._image_prefix + part + self._image_suffix
+            for part in parts
+        )
+
+    def set_images(self, tiny=None, small=None, medium=None, large=None):
+        urls = (tiny, small, medium, large)
+        present = [url for url in urls if url]
+        if not present:
+            self._image_prefix = self._image_suffix = None
+            self._image_parts = _no_images
+            return
+
+        first = present[0]
+        prefix_length = suffix_length = len(first)
+        for url in present[1:]:
+            if not url.startswith(first[:prefix_length]):
+                prefix_length = _common_length(
+                    first, url, prefix_length, str.startswith
+                )
+        for url in present[1:]:
+            if suffix_length and not url.endswith(first[-suffix_length:]):
+                suffix_length = _common_length(first, url, suffix_length, str.endswith)
+        suffix_length = min(suffix_length, len(min(present, key=len)) - prefix_length)
+        prefix = first[:prefix_length]
+        suffix = first[len(first) - suffix_length :]
+        parts = tuple(
+            [
+                url[prefix_length : len(url) - suffix_length] if url else None
+                for url in urls
+            ]
+        )
+        if len(max(filter(None, parts), key=len, default="")) <= 8:
+            # size parts like "44" repeat across stations, share one tuple
+            shared = _image_parts.get(parts)
+            if shared is None:
+                shared = _image_parts[parts] = tuple(map(_intern, parts))
+            parts = shared
+        # a prefix ending in a directory is usually the image host, a short
+        # suffix the file extension, both are the same for many stations
+        self._image_prefix = _intern(prefix) if prefix.endswith("/") else prefix
+        self._image_suffix = _intern(suffix) if len(suffix) <= 8 else suffix
+        self._image_parts = parts
+
+
+def _common_length(first, other, limit, matches):
+    # bisect on startswith/endswith instead of comparing char by char
+    low, high = 0, min(limit, len(first), len(other))
+    while low < high:
+        middle = (low + high + 1) // 2
+        part = first[:middle] if matches is str.startswith else first[-middle:]
+        if matches(other, part):
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def _image_property(index):
+    def fget(self):
+        part = getattr(self, "_image_parts", _no_images)[index]
+        if part is None:
+            return None
+        return self._image_prefix + part + self._image_suffix
+
+    def fset(self, value):
+        images = list(self.images)
+        images[index] = value
+        self.set_images(*images)
+
+    return property(fget, fset)
+
+
+Station.image_tiny = _image_property(0)
+Station.image_small = _image_property(1)
+Station.image_medium = _image_property(2)
+Station.image_large = _image_property(3)
+
+_no_images = (None, None, None, None)
+_image_parts = {}
+
+
+def _intern(value):
+    if isinstance(value, str):
+        return sys.intern(value)
+    return value
 
 
 class RadioNetClient(object):
     base_url = "https://radio.net/"
 
-    session = requests.Session()
     api_prefix = None
     min_bitrate = 96
     max_top_stations = 100
     station_bookmarks = None
     api_key = None
-
-    stations_images = []
-    favorites = []
-
-    cache = {}
-
-    stations_by_id = {}
-    stations_by_slug = {}
+    max_workers = 4
+    search_max_pages = 10
+    search_max_results = None
+    search_page_size = 50
+    connect_timeout = 5
+    read_timeout = 10
+    retries = 2
+    backoff_factor = 0.5
+    breaker_threshold = 5
+    breaker_timeout = 30
+    rate_limiter = None
+    max_retry_after = 60
+    persistent_cache = None
+    station_index = None
+    local_search_max_age = 1440
+    local_search_min_stations = None
+    stream_url_ttl = 360
+    stream_prober = None
+    dead_stream_cooldown = 10
 
     category_param_map = {
         "genres": "genre",
@@ -56,6 +211,22 @@ class RadioNetClient(object):
     def __init__(self, proxy_config=None, user_agent=None):
         super(RadioNetClient, self).__init__()
 
+        # all mutable state is per client, compound updates of the station
+        # indexes and lazily created executors are guarded by ``_lock``
+        self._lock = threading.RLock()
+        self._executor = None
+        self._background_executor = None
+        self._local = threading.local()
+
+        self.favorites = ()
+        self.cache = LRUCache(1000, stale_time=86400)
+        self.in_flight = SingleFlight()
+        self.requests_in_flight = SingleFlight()
+        self.json_loads = get_decoder()
+        self.stations_by_id = LRUCache(5000)
+        self.stations_by_slug = LRUCache(5000)
+        self.dead_streams = LRUCache(1000)
+
         self.session = requests.Session()
 
         if proxy_config is not None:
@@ -65,11 +236,22 @@ class RadioNetClient(object):
         full_user_agent = httpclient.format_user_agent(user_agent)
         self.session.headers.update({"user-agent": full_user_agent})
         self.session.headers.update({"cache-control": "no-cache"})
+        self._mount_adapter()
+
+        self._breaker_lock = threading.Lock()
+        self._breaker_open_until = 0
+        self._failures = 0
 
         self.update_prefix()
 
     def __del__(self):
         self.session.close()
+        if self.persistent_cache is not None:
+            self.persistent_cache.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        if self._background_executor is not None:
+            self._background_executor.shutdown(wait=False)
 
     def set_lang(self, lang):
         if lang == "en":
@@ -89,25 +271,319 @@ class RadioNetClient(object):
     def set_apikey(self, api_key):
         self.api_key = api_key
 
-    def do_get(self, api_suffix, url_params=None):
+    def set_max_workers(self, max_workers):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+            self.max_workers = max_workers
+            self._mount_adapter()
+
+    def set_timeouts(self, connect_timeout, read_timeout, retries):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+
+    def set_json_decoder(self, name):
+        self.json_loads = get_decoder(name)
+
+    def set_rate_limit(self, requests_per_second, burst=1):
+        """Limit API requests to ``requests_per_second``, 0 to disable."""
+        if requests_per_second:
+            self.rate_limiter = RateLimiter(requests_per_second, burst)
+        else:
+            self.rate_limiter = None
+
+    def _mount_adapter(self):
+        adapter = HTTPAdapter(
+            pool_connections=2, pool_maxsize=max(self.max_workers, 10)
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="RadioNetWorker"
+                )
+            return self._executor
+
+    def _map(self, func, items):
+        """Apply ``func`` to ``items`` on the worker pool, keeping their order.
+
+        Tasks run on the pool must not wait on the pool themselves.
+        """
+        items = list(items)
+        if self.max_workers <= 1 or len(items) <= 1:
+            return [func(item) for item in items]
+        return list(
+            self._get_executor().map(
+                partial(self._with_priority, self.get_priority(), func), items
+            )
+        )
+
+    def run_in_background(self, func, *args):
+        """Run ``func`` off the calling thread, one background task at a time.
+
+        Its API requests, including those it fans out on the worker pool, wait
+        for interactive ones when the rate limit is reached.
+        """
+        with self._lock:
+            if self._background_executor is None:
+                self._background_executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="RadioNetBackground"
+                )
+            executor = self._background_executor
+        return executor.submit(self._with_priority, BACKGROUND, func, *args)
+
+    def get_priority(self):
+        return getattr(self._local, "priority", INTERACTIVE)
+
+    def _with_priority(self, priority, func, *args):
+        previous = self.get_priority()
+        self._local.priority = priority
+        try:
+            return func(*args)
+        finally:
+            self._local.priority = previous
+
+    def do_get(self, api_suffix, url_params=None, headers=None):
+        """GET an API endpoint, retrying connection errors and 5xx responses.
+
+        Requests wait for the rate limiter, if one is set. Responses with
+        status 429 are retried after their ``Retry-After`` delay.
+
+        Returns the last response, or None if no response was received or
+        the circuit breaker is open after repeated failures.
+        """
         if self.api_prefix is None:
             return None
 
-        if url_params is None:
-            url_params = {}
-        url_params["apikey"] = self.api_key
+        if self._circuit_open():
+            logger.debug("Radio.net: API unavailable, skipping %s", api_suffix)
+            return None
 
-        response = self.session.get(self.api_prefix + api_suffix, params=url_params)
+        url_params = dict(url_params or {})
+        url_params["apikey"] = self.api_key
 
+        response = None
+        delay = None
+        for attempt in range(self.retries + 1):
+            if attempt > 0:
+                if delay is None:
+                    delay = (
+                        self.backoff_factor
+                        * 2 ** (attempt - 1)
+                        * random.uniform(0.5, 1.5)
+                    )
+                time.sleep(delay)
+                delay = None
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(self.get_priority())
+            try:
+                response = self.session.get(
+                    self.api_prefix + api_suffix,
+                    params=url_params,
+                    headers=headers,
+                    timeout=(self.connect_timeout, self.read_timeout),
+                )
+            except requests.RequestException as e:
+                logger.warning("Radio.net: Request to %s failed: %s", api_suffix, e)
+                response = None
+                continue
+            if response.status_code == 429:
+                delay = self._retry_after(response)
+                continue
+            if response.status_code < 500:
+                self._record_success()
+                return response
+
+        if response is not None and response.status_code == 429:
+            return response
+        self._record_failure()
         return response
 
-    def get_cache(self, key):
-        if self.cache.get(key) is not None and self.cache[key].expired() is False:
-            return self.cache[key].value()
+    def _retry_after(self, response):
+        """Return how long to wait before retrying a 429 response.
+
+        With a rate limiter, every request is held back for the
+        ``Retry-After`` delay instead. None means the usual backoff applies.
+        """
+        delay = parse_retry_after(response.headers.get("Retry-After"))
+        if delay is None:
+            return None
+        delay = min(delay, self.max_retry_after)
+        logger.warning("Radio.net: Too many requests, waiting %.1fs", delay)
+        if self.rate_limiter is not None:
+            self.rate_limiter.pause(delay)
+            return 0
+        return delay
+
+    def _get_json(self, api_suffix, url_params=None, error="Error on request"):
+        """GET an API endpoint and return the decoded JSON, or None on errors.
+
+        Concurrent requests for the same endpoint and parameters share one
+        HTTP request and one decoded result, which callers must not modify.
+        """
+        return self._get_response_json(api_suffix, url_params, error)[0]
+
+    def _get_json_if_modified(
+        self, cache_key, api_suffix, url_params=None, error="Error on request"
+    ):
+        """Like :meth:`_get_json`, conditional on the cached ``cache_key``.
+
+        Returns the JSON, or :data:`NOT_MODIFIED` if the API confirmed that the
+        cached item is still current, together with the validators of the
+        response and the cached item the request was made for.
+        """
+        item = self._get_cache_item(cache_key)
+        validators = item.validators if item is not None else None
+        json, validators = self._get_response_json(
+            api_suffix, url_params, error, validators
+        )
+        return json, validators, item
+
+    def _get_response_json(self, api_suffix, url_params, error, validators=None):
+        request_key = api_suffix
+        if url_params:
+            request_key += "?" + urlencode(sorted(url_params.items()))
+        if validators:
+            request_key += "#" + urlencode(sorted(validators.items()))
+        return self.requests_in_flight.do(
+            request_key, self._request_json, api_suffix, url_params, error, validators
+        )
+
+    def _request_json(self, api_suffix, url_params, error, validators):
+        headers = None
+        if validators:
+            headers = {}
+            if "etag" in validators:
+                headers["if-none-match"] = validators["etag"]
+            if "last-modified" in validators:
+                headers["if-modified-since"] = validators["last-modified"]
+
+        response = self.do_get(api_suffix, url_params, headers)
+        if response is None:
+            logger.error("Radio.net: " + error + ". API not reachable.")
+            return None, None
+        if response.status_code == 304 and validators:
+            logger.debug("Radio.net: %s not modified", api_suffix)
+            return NOT_MODIFIED, validators
+        if response.status_code != 200:
+            logger.error("Radio.net: " + error + ". Error: " + response.text)
+            return None, None
+
+        validators = {}
+        for header in ("etag", "last-modified"):
+            if response.headers.get(header):
+                validators[header] = response.headers[header]
+        return self.json_loads(response.content), validators or None
+
+    def is_api_available(self):
+        """Tell whether requests are sent, i.e. the circuit breaker is closed."""
+        return not self._circuit_open()
+
+    def _circuit_open(self):
+        with self._breaker_lock:
+            return self._breaker_open_until > time.time()
+
+    def _record_success(self):
+        with self._breaker_lock:
+            self._failures = 0
+
+    def _record_failure(self):
+        with self._breaker_lock:
+            self._failures += 1
+            if self._failures >= self.breaker_threshold:
+                logger.warning(
+                    "Radio.net: API failing, pausing requests for %ds",
+                    self.breaker_timeout,
+                )
+                self._breaker_open_until = time.time() + self.breaker_timeout
+
+    def set_cache_size(self, cache_size, stations_size):
+        self.cache.resize(cache_size)
+        self.stations_by_id.resize(stations_size)
+        self.stations_by_slug.resize(stations_size)
+
+    def cache_stats(self):
+        return {
+            "cache": self.cache.stats(),
+            "stations_by_id": self.stations_by_id.stats(),
+            "stations_by_slug": self.stations_by_slug.stats(),
+        }
+
+    def set_persistent_cache(self, path):
+        if self.persistent_cache is not None:
+            self.persistent_cache.close()
+        self.persistent_cache = PersistentCache(path, self.cache.stale_time)
+
+    def get_cache(self, key, stale=False):
+        item = self._get_cache_item(key)
+        if item is not None and (stale or item.expired() is False):
+            return item.value()
         return None
 
-    def set_cache(self, key, value, expires):
-        self.cache[key] = CacheItem(value, expires)
+    def _get_cache_item(self, key):
+        item = self.cache.get(key)
+        if item is None and self.persistent_cache is not None:
+            item = self.persistent_cache.get(key)
+            if item is not None:
+                item = CacheItem(
+                    self._adopt_stations(item.value()),
+                    expires_at=item.expires_at(),
+                    validators=item.validators,
+                )
+                self.cache[key] = item
+        return item
+
+    def _adopt_stations(self, value):
+        """Swap unpickled stations for the canonical objects of their ids."""
+        if isinstance(value, Station):
+            with self._lock:
+                station = self.stations_by_id.get(value.id)
+                if station is None:
+                    station = value
+                    self._index_station(station)
+            return station
+        if isinstance(value, (list, tuple)) and value and isinstance(value[0], Station):
+            return type(value)(self._adopt_stations(station) for station in value)
+        return value
+
+    def _cached(self, cache_key, fetch, *args):
+        """Return the cached value for ``cache_key`` or load it with ``fetch``.
+
+        Expired values are returned as they are and refreshed in the
+        background. ``fetch`` is responsible for storing its result in the
+        cache, concurrent loads of the same key share a single call.
+        """
+        item = self._get_cache_item(cache_key)
+        if item is None:
+            return self.in_flight.do(cache_key, fetch, *args)
+        if item.expired() and not self.in_flight.running(cache_key):
+            self.run_in_background(self._refresh, cache_key, fetch, *args)
+        return item.value()
+
+    def _refresh(self, cache_key, fetch, *args):
+        item = self._get_cache_item(cache_key)
+        if item is None or item.expired():
+            logger.debug("Radio.net: Refreshing %s", cache_key)
+            self.in_flight.do(cache_key, fetch, *args)
+
+    def _renew_cache(self, key, item, expires):
+        """Store ``item`` again for ``expires`` minutes after a 304 response."""
+        if item is None:
+            item = self._get_cache_item(key)
+            if item is None:
+                return None
+        return self.set_cache(key, item.value(), expires, item.validators)
+
+    def set_cache(self, key, value, expires, validators=None):
+        item = CacheItem(value, expires, validators=validators)
+        self.cache[key] = item
+        if self.persistent_cache is not None:
+            self.persistent_cache.set(key, item)
         return value
 
     def get_station_by_id(self, station_id):
@@ -120,106 +596,140 @@ class RadioNetClient(object):
             return self._get_station_by_id(station_slug)
         return self.stations_by_slug.get(station_slug)
 
+    def get_stations(self, identifiers):
+        """Return a dict of station id or slug to station.
+
+        Stations are served from the station indexes where possible, the
+        remaining ones are fetched concurrently. Identifiers that cannot be
+        resolved are left out.
+        """
+        stations = {}
+        missing = []
+        for identifier in identifiers:
+            if identifier in stations or identifier in missing:
+                continue
+            if isinstance(identifier, int):
+                station = self.stations_by_id.get(identifier)
+            else:
+                station = self.stations_by_slug.get(identifier)
+            if station:
+                stations[identifier] = station
+            else:
+                missing.append(identifier)
+
+        for identifier, station in zip(missing, self._map(self._get_station, missing)):
+            if station:
+                stations[identifier] = station
+        return stations
+
+    def _get_station(self, identifier):
+        try:
+            return self._get_station_by_id(identifier)
+        except Exception:
+            logger.exception("Radio.net: Unable to load station %s", identifier)
+            return None
+
     def _get_station_by_id(self, station_id):
-        cache_key = "station/" + str(station_id)
-        cache = self.get_cache(cache_key)
-        if cache is not None:
-            return cache
+        return self._cached(
+            "station/" + str(station_id), self._fetch_station, station_id
+        )
 
+    def _fetch_station(self, station_id):
         api_suffix = "/search/station"
 
         url_params = {
             "station": station_id,
         }
 
-        response = self.do_get(api_suffix, url_params)
-
-        if response.status_code != 200:
-            logger.error(
-                "Radio.net: Error on get station by id "
-                + str(station_id)
-                + ". Error: "
-                + response.text
-            )
+        cache_key = "station/" + str(station_id)
+        json, validators, item = self._get_json_if_modified(
+            cache_key,
+            api_suffix,
+            url_params,
+            "Error on get station by id " + str(station_id),
+        )
+        if json is NOT_MODIFIED:
+            station = self._renew_cache(cache_key, item, 1440)
+            self._renew_cache("station/" + station.slug, None, 1440)
+            return station
+        if json is None:
             return False
 
         logger.debug("Radio.net: Done get top stations list")
-        json = response.json()
 
-        if not self.stations_by_id.get(json["id"]):
-            station = Station()
-            station.playable = True
-        else:
-            station = self.stations_by_id[json["id"]]
-        station.id = json["id"]
-        station.continent = json["continent"]
-        station.country = json["country"]
-        station.city = json["city"]
-        station.genres = ", ".join(json["genres"])
+        station = self._get_or_create_station(json["id"])
+        station.continent = _intern(json["continent"])
+        station.country = _intern(json["country"])
+        station.city = _intern(json["city"])
+        station.genres = _intern(", ".join(json["genres"]))
         station.name = json["name"]
         station.slug = json["subdomain"]
-        station.stream_url = self._get_stream_url(json["streamUrls"], self.min_bitrate)
-        station.image_tiny = json["logo44x44"]
-        station.image_small = json["logo100x100"]
-        station.image_medium = json["logo175x175"]
-        station.image_large = json["logo300x300"]
+        station.streams = self._get_streams(
+            json["streamUrls"],
+            self._get_stream_url(json["streamUrls"], self.min_bitrate),
+        )
+        station.set_images(
+            json["logo44x44"],
+            json["logo100x100"],
+            json["logo175x175"],
+            json["logo300x300"],
+        )
         station.description = json["shortDescription"]
         if json["playable"] == "PLAYABLE":
             station.playable = True
 
-        self.stations_by_id[station.id] = station
-        self.stations_by_slug[station.slug] = station
+        self._index_station(station)
 
-        self.set_cache("station/" + str(station.id), station, 1440)
-        self.set_cache("station/" + station.slug, station, 1440)
+        self.set_cache("station/" + str(station.id), station, 1440, validators)
+        self.set_cache("station/" + station.slug, station, 1440, validators)
         return station
 
-    def _get_station_from_search_result(self, result):
-        if not self.stations_by_id.get(result["id"]):
-            station = Station()
-            station.playable = True
-        else:
-            station = self.stations_by_id[result["id"]]
-
-        station.id = result["id"]
-        if result["continent"] is not None:
-            station.continent = result["continent"]["value"]
-        else:
-            station.continent = ""
-
-        if result["country"] is not None:
-            station.country = result["country"]["value"]
-        else:
-            station.country = ""
-
-        if result["city"] is not None:
-            station.city = result["city"]["value"]
-        else:
-            station.city = ""
-
-        if result["name"] is not None:
-            station.name = result["name"]["value"]
-        else:
-            station.name = ""
-
-        if result["subdomain"] is not None:
-            station.slug = result["subdomain"]["value"]
-        else:
-            station.slug = ""
+    def _get_or_create_station(self, station_id):
+        """Return the indexed Station object for ``station_id``.
 
-        if result["shortDescription"] is not None:
-            station.description = result["shortDescription"]["value"]
-        else:
-            station.description = ""
-
-        station.image_tiny = result["logo44x44"]
-        station.image_small = result["logo100x100"]
-        station.image_medium = result["logo175x175"]
+        A station evicted from ``stations_by_id`` gets a new object the next
+        time it is seen, cached pages keep the old one until they expire.
+        """
+        with self._lock:
+            station = self.stations_by_id.get(station_id)
+            if station is None:
+                station = Station(station_id)
+                station.playable = True
+                self.stations_by_id[station_id] = station
+            return station
 
-        self.stations_by_id[station.id] = station
-        self.stations_by_slug[station.slug] = station
+    def _get_station_from_search_result(self, result):
+        fields = project_match(result)
+        station = self._get_or_create_station(fields[0])
+
+        if fields[1:] == tuple(getattr(station, field) for field in MATCH_FIELDS):
+            # unchanged since the station was last seen, so its strings are
+            # interned and its words are indexed already
+            self._index_station(station, reindex=False)
+            return station
+
+        station.continent = _intern(fields[1])
+        station.country = _intern(fields[2])
+        station.city = _intern(fields[3])
+        station.name, station.slug, station.description = fields[4:7]
+        station.set_images(*fields[7:], large=station.image_large)
+
+        self._index_station(station)
         return station
 
+    def _index_station(self, station, reindex=True):
+        with self._lock:
+            self.stations_by_id[station.id] = station
+            self.stations_by_slug[station.slug] = station
+        if reindex and self.station_index is not None:
+            self.station_index.add(station)
+
+    def _get_stations_from_matches(self, json):
+        return tuple(
+            self._get_station_from_search_result(match)
+            for match in json["categories"][0]["matches"]
+        )
+
     def get_genres(self):
         return self._get_items("genres")
 
@@ -236,27 +746,21 @@ class RadioNetClient(object):
         return self._get_items("countries")
 
     def _get_items(self, key):
-        cached = self.get_cache(key)
-        if cached is not None:
-            return cached
+        return self._cached(key, self._fetch_items, key)
 
+    def _fetch_items(self, key):
         api_suffix = "/search/get" + key
-        response = self.do_get(api_suffix)
-        if response.status_code != 200:
-            logger.error(
-                "Radio.net: Error on get item list "
-                + str(api_suffix)
-                + ". Error: "
-                + response.text
-            )
+        json, validators, item = self._get_json_if_modified(
+            key, api_suffix, None, "Error on get item list " + str(api_suffix)
+        )
+        if json is NOT_MODIFIED:
+            return self._renew_cache(key, item, 1440)
+        if json is None:
             return False
-        return self.set_cache(key, response.json(), 1440)
+        return self.set_cache(key, json, 1440, validators)
 
     def get_sorted_category(self, category, name, sorting, page):
-        results = []
-        for result in self._get_sorted_category(category, name, sorting, page):
-            results.append(self._get_station_from_search_result(result))
-        return results
+        return list(self._get_sorted_category(category, name, sorting, page) or [])
 
     def _get_sorted_category(self, category, name, sorting, page):
 
@@ -266,10 +770,12 @@ class RadioNetClient(object):
             sorting = "RANK"
 
         cache_key = category + "/" + name + "/" + sorting + "/" + str(page)
-        cache = self.get_cache(cache_key)
-        if cache is not None:
-            return cache
+        return self._cached(
+            cache_key, self._fetch_sorted_category, category, name, sorting, page
+        )
 
+    def _fetch_sorted_category(self, category, name, sorting, page):
+        cache_key = category + "/" + name + "/" + sorting + "/" + str(page)
         api_suffix = "/search/stationsby" + self.category_param_map[category]
         url_params = {
             self.category_param_map[category]: name,
@@ -278,83 +784,118 @@ class RadioNetClient(object):
             "pageindex": page,
         }
 
-        response = self.do_get(api_suffix, url_params)
-
-        if response.status_code != 200:
-            logger.error(
-                "Radio.net: Error on get station by "
-                + str(category)
-                + ". Error: "
-                + response.text
+        json, validators, item = self._get_json_if_modified(
+            cache_key,
+            api_suffix,
+            url_params,
+            "Error on get station by " + str(category),
+        )
+        if json is NOT_MODIFIED:
+            if self._renew_cache(category + "/" + name, None, 10) is not None:
+                return self._renew_cache(cache_key, item, 10)
+            # the page count was evicted, a 304 cannot restore it
+            json = self._get_json(
+                api_suffix, url_params, "Error on get station by " + str(category)
             )
+        if json is None:
             return False
 
-        json = response.json()
         self.set_cache(category + "/" + name, int(json["numberPages"]), 10)
-        return self.set_cache(cache_key, json["categories"][0]["matches"], 10)
+        return self.set_cache(
+            cache_key, self._get_stations_from_matches(json), 10, validators
+        )
 
     def get_category(self, category, page):
-        results = []
-        for result in self._get_category(category, page):
-            results.append(self._get_station_from_search_result(result))
-        return results
+        return list(self._get_category(category, page) or [])
 
     def _get_category(self, category, page):
-        cache_key = category + "/" + str(page)
-        cache = self.get_cache(cache_key)
-        if cache is not None:
-            return cache
+        return self._cached(
+            category + "/" + str(page), self._fetch_category, category, page
+        )
 
+    def _fetch_category(self, category, page):
+        cache_key = category + "/" + str(page)
         api_suffix = "/search/" + category
         url_params = {"sizeperpage": 50, "pageindex": page}
 
-        response = self.do_get(api_suffix, url_params)
-
-        if response.status_code != 200:
-            logger.error(
-                "Radio.net: Error on get station by "
-                + str(category)
-                + ". Error: "
-                + response.text
+        json, validators, item = self._get_json_if_modified(
+            cache_key,
+            api_suffix,
+            url_params,
+            "Error on get station by " + str(category),
+        )
+        if json is NOT_MODIFIED:
+            if self._renew_cache(category, None, 10) is not None:
+                return self._renew_cache(cache_key, item, 10)
+            json = self._get_json(
+                api_suffix, url_params, "Error on get station by " + str(category)
             )
+        if json is None:
             return False
 
-        json = response.json()
         self.set_cache(category, int(json["numberPages"]), 10)
-        return self.set_cache(cache_key, json["categories"][0]["matches"], 10)
+        return self.set_cache(
+            cache_key, self._get_stations_from_matches(json), 10, validators
+        )
 
     def get_sorted_category_pages(self, category, name):
         cache_key = category + "/" + name
-        cache = self.get_cache(cache_key)
+        cache = self.get_cache(cache_key, stale=True)
         if cache is not None:
             return cache
 
         self.get_sorted_category(category, name, "rank", 1)
-
-        return self.get_cache(cache_key)
+        cache = self.get_cache(cache_key, stale=True)
+        if cache is None:
+            # page 1 was served from the cache, but its page count was evicted
+            self.in_flight.do(
+                cache_key + "/RANK/1",
+                self._fetch_sorted_category,
+                category,
+                name,
+                "RANK",
+                1,
+            )
+            cache = self.get_cache(cache_key, stale=True)
+        return cache
 
     def get_category_pages(self, category):
         cache_key = category
-        cache = self.get_cache(cache_key)
+        cache = self.get_cache(cache_key, stale=True)
         if cache is not None:
             return cache
 
         self.get_category(category, 1)
-
-        return self.get_cache(cache_key)
+        cache = self.get_cache(cache_key, stale=True)
+        if cache is None:
+            # page 1 was served from the cache, but its page count was evicted
+            self.in_flight.do(cache_key + "/1", self._fetch_category, category, 1)
+            cache = self.get_cache(cache_key, stale=True)
+        return cache
 
     def set_favorites(self, favorites):
         self.favorites = favorites
 
     def get_favorites(self):
-        cache_key = "favorites"
-        cache = self.get_cache(cache_key)
-        if cache is not None:
-            return cache
+        return self._cached(
+            "favorites/" + ",".join(self.favorites), self._fetch_favorites
+        )
 
-        favorite_stations = []
-        for station_slug in self.favorites:
+    def _fetch_favorites(self):
+        cache_key = "favorites/" + ",".join(self.favorites)
+        favorite_stations = [
+            station
+            for station in self._map(self._get_favorite_station, self.favorites)
+            if station and station.playable
+        ]
 
+        logger.info(
+            "Radio.net: Loaded " + str(len(favorite_stations)) + " favorite stations."
+        )
+        return self.set_cache(cache_key, favorite_stations, 1440)
+
+    def _get_favorite_station(self, station_slug):
+        try:
             station = self.get_station_by_slug(station_slug)
 
             if station is False:
@@ -363,13 +904,10 @@ class RadioNetClient(object):
                     "query": station_slug,
                     "pageindex": 1,
                 }
-                response = self.do_get(api_suffix, url_params)
+                json = self._get_json(api_suffix, url_params, "Search error")
 
-                if response.status_code != 200:
-                    logger.error("Radio.net: Search error " + response.text)
-                else:
+                if json is not None:
                     logger.debug("Radio.net: Done search")
-                    json = response.json()
 
                     number_pages = int(json["numberPages"])
 
@@ -381,51 +919,248 @@ class RadioNetClient(object):
                     else:
                         logger.warning("Radio.net: No results for %s", station_slug)
 
-            if station and station.playable:
-                favorite_stations.append(station)
+            return station
+        except Exception:
+            logger.exception(
+                "Radio.net: Unable to load favorite station %s", station_slug
+            )
+            return None
+
+    def warm_up(self):
+        """Prefetch item lists, first category pages and favorites."""
+        tasks = [
+            ("genres", self.get_genres),
+            ("topics", self.get_topics),
+            ("languages", self.get_languages),
+            ("cities", self.get_cities),
+            ("countries", self.get_countries),
+            ("topstations", lambda: self.get_category("topstations", 1)),
+            ("localstations", lambda: self.get_category("localstations", 1)),
+        ]
+        total = len(tasks) + (1 if self.favorites else 0)
+
+        started = time.time()
+        progress = {"done": 0}
+        lock = threading.Lock()
+
+        def run(task):
+            name, func = task
+            try:
+                func()
+            except Exception:
+                logger.warning("Radio.net: Warm-up of %s failed", name, exc_info=True)
+            with lock:
+                progress["done"] += 1
+                logger.debug(
+                    "Radio.net: Warm-up %d/%d done (%s)", progress["done"], total, name
+                )
+
+        self._map(run, tasks)
+        # favorites fan out on the worker pool themselves, so they are loaded
+        # from this thread rather than as one of the pool's tasks
+        if self.favorites:
+            run(("favorites", self.get_favorites))
 
         logger.info(
-            "Radio.net: Loaded " + str(len(favorite_stations)) + " favorite stations."
+            "Radio.net: Warm-up of %d lists done in %.1fs", total, time.time() - started
         )
-        return self.set_cache(cache_key, favorite_stations, 1440)
 
-    def do_search(self, query_string, page_index=1, search_results=None):
+    def do_search(self, query_string, max_results=None):
+        search_results = list(self.iter_search(query_string, max_results))
+        logger.info("Radio.net: Found " + str(len(search_results)) + " stations.")
+        return search_results
+
+    def iter_search(self, query_string, max_results=None):
+        """Yield playable stations matching ``query_string`` page by page.
+
+        Pages after the first one are fetched ahead on the worker pool, at most
+        ``max_workers`` at a time and no more than ``max_results`` still needs,
+        and are only requested while the caller keeps consuming results.
+        """
+        if not max_results:
+            max_results = None
+
+        json = self._search_page(query_string, 1)
+        if json is None:
+            return
+
+        number_pages = int(json["numberPages"])
+        if self.search_max_pages:
+            number_pages = min(number_pages, self.search_max_pages)
+
+        found = 0
+        priority = self.get_priority()
+        pages = iter(range(2, number_pages + 1))
+        pending = deque()
+
+        def fetch_ahead(expected):
+            limit = self.max_workers
+            if max_results is not None:
+                # pages still needed if every station on them is playable
+                missing = max_results - expected
+                limit = min(limit, -(-missing // self.search_page_size))
+            while len(pending) < limit:
+                page_index = next(pages, None)
+                if page_index is None:
+                    break
+                pending.append(
+                    self._get_executor().submit(
+                        self._with_priority,
+                        priority,
+                        self._search_page,
+                        query_string,
+                        page_index,
+                    )
+                )
 
+        try:
+            while True:
+                matches = json["categories"][0]["matches"] if json is not None else []
+                fetch_ahead(found + len(matches))
+
+                for match in matches:
+                    station = self._get_station_from_search_result(match)
+                    if station and station.playable:
+                        yield station
+                        found += 1
+                        if max_results is not None and found >= max_results:
+                            return
+
+                if not pending:
+                    fetch_ahead(found)
+                    if not pending:
+                        break
+                json = pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def _search_page(self, query_string, page_index):
         api_suffix = "/search/stationsonly"
         url_params = {
             "query": query_string,
-            "sizeperpage": 50,
+            "sizeperpage": self.search_page_size,
             "pageindex": page_index,
         }
 
-        response = self.do_get(api_suffix, url_params)
-
-        if response.status_code != 200:
-            logger.error("Radio.net: Search error " + response.text)
-        else:
-            logger.debug("Radio.net: Done search")
-            if search_results is None:
-                search_results = []
-            json = response.json()
-            for match in json["categories"][0]["matches"]:
-                station = self._get_station_from_search_result(match)
-                if station and station.playable:
-                    search_results.append(station)
-
-            number_pages = int(json["numberPages"])
-            if number_pages >= page_index:
-                self.do_search(query_string, page_index + 1, search_results)
-            else:
-                logger.info(
-                    "Radio.net: Found " + str(len(search_results)) + " stations."
-                )
-        return search_results
+        json = self._get_json(api_suffix, url_params, "Search error")
+        if json is not None:
+            logger.debug("Radio.net: Done search page %d", page_index)
+        return json
 
     def get_stream_url(self, station_id):
+        stream_url = self.get_cache("stream/" + str(station_id))
+        if stream_url is not None:
+            return stream_url
+        return self._resolve_stream_url(station_id)
+
+    def _resolve_stream_url(self, station_id):
         station = self.get_station_by_id(station_id)
-        if not station.stream_url:
+        if station and not station.stream_url:
             station = self._get_station_by_id(station.id)
-        return station.stream_url
+        if not station or not station.stream_url:
+            return None
+
+        stream_url = station.stream_url
+        if self.stream_prober is not None and len(station.streams) > 1:
+            probe = self._find_stream(station)
+            if probe is not None:
+                stream_url = probe.url
+
+        for key in set([station_id, station.id, station.slug]):
+            if key:
+                self.set_cache("stream/" + str(key), stream_url, self.stream_url_ttl)
+        return stream_url
+
+    def get_stream_urls(self, station_id):
+        """Return every stream URL of a station, the preferred one first.
+
+        Streams marked dead within the last ``dead_stream_cooldown`` minutes
+        are left out, unless no other stream is left.
+        """
+        stream_url = self.get_stream_url(station_id)
+        if stream_url is None:
+            return []
+
+        station = self.get_station_by_id(station_id)
+        others = []
+        if station:
+            ranking = self.get_cache("streams/" + str(station.id))
+            if ranking is not None:
+                others = [probe.url for probe in ranking]
+            else:
+                others = [url for url, bit_rate in station.streams]
+
+        stream_urls = list(dict.fromkeys([stream_url] + others))
+        alive = [url for url in stream_urls if not self.is_stream_dead(url)]
+        return alive or stream_urls
+
+    def mark_stream_dead(self, stream_url):
+        self.dead_streams[stream_url] = CacheItem(True, self.dead_stream_cooldown)
+
+    def is_stream_dead(self, stream_url):
+        item = self.dead_streams.get(stream_url)
+        return item is not None and not item.expired()
+
+    def get_ranked_streams(self, station):
+        """Return the probed streams of ``station``, the best one first."""
+        ranking = self.get_cache("streams/" + str(station.id))
+        if ranking is None:
+            ranking = self.stream_prober.rank(station.streams, self.min_bitrate)
+            self._set_ranking(station, ranking)
+        return ranking
+
+    def _find_stream(self, station):
+        # only wait for the first good probe, the full ranking is cached once
+        # the slower probes finished
+        ranking = self.get_cache("streams/" + str(station.id))
+        if ranking is not None:
+            return next((probe for probe in ranking if probe.healthy), None)
+        return self.stream_prober.find(
+            station.streams,
+            self.min_bitrate,
+            callback=lambda ranking: self._set_ranking(station, ranking),
+        )
+
+    def _set_ranking(self, station, ranking):
+        logger.debug(
+            "Radio.net: Ranked streams of %s: %s",
+            station.id,
+            ", ".join(
+                "%s (%s)" % (probe.url, "ok" if probe.healthy else "failed")
+                for probe in ranking
+            ),
+        )
+        self.set_cache(
+            "streams/" + str(station.id), tuple(ranking), self.stream_url_ttl
+        )
+
+    def prefetch_stream_urls(self, station_ids):
+        """Resolve the stream URLs of ``station_ids`` in the background.
+
+        Resolved URLs are cached for ``stream_url_ttl`` minutes, so that
+        :meth:`get_stream_url` does not have to wait for the API when the
+        station is played. Returns the background future, or None when every
+        stream URL is already known.
+        """
+        missing = [
+            station_id
+            for station_id in dict.fromkeys(station_ids)
+            if self.get_cache("stream/" + str(station_id)) is None
+        ]
+        if not missing:
+            return None
+        logger.debug("Radio.net: Prefetching %d stream URLs", len(missing))
+        return self.run_in_background(self._map, self._prefetch_stream_url, missing)
+
+    def _prefetch_stream_url(self, station_id):
+        try:
+            return self._resolve_stream_url(station_id)
+        except Exception:
+            logger.warning(
+                "Radio.net: Unable to prefetch stream of %s", station_id, exc_info=True
+            )
+            return None
 
     def _get_stream_url(self, stream_json, bit_rate):
         stream_url = None
@@ -440,14 +1175,10 @@ class RadioNetClient(object):
 
         return stream_url
 
-
-class CacheItem(object):
-    def __init__(self, value, expires=10):
-        self._value = value
-        self._expires = time.time() + expires * 60
-
-    def expired(self):
-        return self._expires < time.time()
-
-    def value(self):
-        return self._value
+    def _get_streams(self, stream_json, stream_url):
+        """Return the URL and bitrate of every stream, ``stream_url`` first."""
+        streams = [
+            (stream["streamUrl"], int(stream["bitRate"])) for stream in stream_json
+        ]
+        streams.sort(key=lambda stream: stream[0] != stream_url)
+        return tuple(streams)
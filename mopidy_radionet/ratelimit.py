@@ -0,0 +1,79 @@
+from __future__ import unicode_literals
+
+import email.utils
+import threading
+import time
+
+INTERACTIVE = 0
+BACKGROUND = 1
+
+
+def parse_retry_after(value):
+    """Return the delay in seconds of a ``Retry-After`` header, or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at is None:
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class RateLimiter(object):
+    """Token bucket limiting requests to ``rate`` per second.
+
+    Up to ``burst`` requests can be made at once after a quiet period.
+    Interactive callers are served first: background callers only take a
+    token while no interactive caller is waiting for one. :meth:`pause`
+    holds back every caller, for example when the API asks to retry later.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0
+        self._waiting = [0, 0]
+        self._condition = threading.Condition()
+
+    def acquire(self, priority=INTERACTIVE):
+        with self._condition:
+            self._waiting[priority] += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if now < self._paused_until:
+                        delay = self._paused_until - now
+                    elif priority == BACKGROUND and self._waiting[INTERACTIVE]:
+                        delay = 1 / self.rate
+                    elif self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    else:
+                        delay = (1 - self._tokens) / self.rate
+                    self._condition.wait(delay)
+            finally:
+                self._waiting[priority] -= 1
+                self._condition.notify_all()
+
+    def pause(self, seconds):
+        with self._condition:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            # no tokens build up while paused
+            self._tokens = 0
+            self._updated = self._paused_until
+
+    def _refill(self, now):
+        if now > self._updated:
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
@@ -0,0 +1,76 @@
+from __future__ import unicode_literals
+
+from collections import namedtuple
+from functools import lru_cache
+
+RadioNetUri = namedtuple(
+    "RadioNetUri", ["category", "value", "sorting", "page", "identifier"]
+)
+RadioNetUri.__doc__ = """A parsed ``radionet:`` URI.
+
+``category`` is None for URIs that are not understood. ``page`` is an int,
+``identifier`` is the station id as an int, or the station slug for
+``radionet:track:<slug>`` URIs.
+"""
+
+SORTED_CATEGORIES = frozenset(["genres", "topics", "languages", "cities", "countries"])
+PAGED_CATEGORIES = frozenset(["root", "favorites", "topstations", "localstations"])
+SORTINGS = frozenset(["rank", "az"])
+
+_unknown = RadioNetUri(None, None, None, None, None)
+
+
+def _number(part):
+    if part.isdigit() and part.isascii():
+        return int(part)
+    return None
+
+
+@lru_cache(maxsize=4096)
+def parse_uri(uri):
+    """Parse a ``radionet:`` URI into a :class:`RadioNetUri`.
+
+    The URI is split once on colons and dispatched on its category, results
+    are cached as browsing and lookups see the same URIs over and over.
+    """
+    parts = uri.split(":")
+    if parts[0] != "radionet" or len(parts) < 2 or "" in parts:
+        return _unknown
+
+    category = parts[1]
+    count = len(parts)
+    if category in SORTED_CATEGORIES:
+        if count == 2:
+            return RadioNetUri(category, None, None, None, None)
+        if count == 3:
+            return RadioNetUri(category, parts[2], None, None, None)
+        if parts[3] not in SORTINGS or count > 5:
+            return _unknown
+        if count == 4:
+            return RadioNetUri(category, parts[2], parts[3], None, None)
+        page = _number(parts[4])
+        if page is None:
+            return _unknown
+        return RadioNetUri(category, parts[2], parts[3], page, None)
+
+    if count == 2:
+        if category in PAGED_CATEGORIES or category in ("station", "track"):
+            return RadioNetUri(category, None, None, None, None)
+        return _unknown
+    if count > 3:
+        return _unknown
+
+    number = _number(parts[2])
+    if category in PAGED_CATEGORIES:
+        if number is None:
+            return _unknown
+        return RadioNetUri(category, None, None, number, None)
+    if category == "station":
+        if number is None:
+            return _unknown
+        return RadioNetUri(category, None, None, None, number)
+    if category == "track":
+        return RadioNetUri(
+            category, None, None, None, parts[2] if number is None else number
+        )
+    return _unknown
@@ -30,6 +30,9 @@ setup(
         'setuptools',
         'uritools >= 1.0'
     ],
+    extras_require={
+        'fast-json': ['orjson'],
+    },
     entry_points={
         'mopidy.ext': [
             'radionet = mopidy_radionet:Extension',
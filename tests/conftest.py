@@ -25,3 +25,55 @@ def library(backend_mock):
 @pytest.fixture
 def radionet(backend_mock):
     return backend_mock.radionet
+
+
+@pytest.fixture
+def station_match():
+    def factory(station_id, name=None):
+        name = name or "Station %d" % station_id
+        return {
+            "id": station_id,
+            "continent": {"value": "Europe"},
+            "country": {"value": "Poland"},
+            "city": {"value": "Warsaw"},
+            "name": {"value": name},
+            "subdomain": {"value": "station%d" % station_id},
+            "shortDescription": {"value": "Description of %s" % name},
+            "logo44x44": "https://static.radio.net/%d_44.png" % station_id,
+            "logo100x100": "https://static.radio.net/%d_100.png" % station_id,
+            "logo175x175": "https://static.radio.net/%d_175.png" % station_id,
+        }
+
+    return factory
+
+
+@pytest.fixture
+def station_json():
+    def factory(station_id, name=None, stream_urls=None):
+        name = name or "Station %d" % station_id
+        if stream_urls is None:
+            stream_urls = [
+                {
+                    "streamUrl": "http://stream.example.com/%d" % station_id,
+                    "bitRate": 128,
+                    "streamStatus": "VALID",
+                }
+            ]
+        return {
+            "id": station_id,
+            "continent": "Europe",
+            "country": "Poland",
+            "city": "Warsaw",
+            "genres": ["Pop", "Rock"],
+            "name": name,
+            "subdomain": "station%d" % station_id,
+            "streamUrls": stream_urls,
+            "logo44x44": "https://static.radio.net/%d_44.png" % station_id,
+            "logo100x100": "https://static.radio.net/%d_100.png" % station_id,
+            "logo175x175": "https://static.radio.net/%d_175.png" % station_id,
+            "logo300x300": "https://static.radio.net/%d_300.png" % station_id,
+            "shortDescription": "Description of %s" % name,
+            "playable": "PLAYABLE",
+        }
+
+    return factory
@@ -0,0 +1,156 @@
+import pickle
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from mopidy_radionet.cache import (
+    CacheItem,
+    LRUCache,
+    PersistentCache,
+    SingleFlight,
+)
+from mopidy_radionet.radionet import RadioNetClient
+
+
+def test_persistent_cache_roundtrip(tmp_path):
+    store = PersistentCache(tmp_path / "cache.sqlite3")
+    store.set("genres", CacheItem(["Rock", "Jazz"], 10))
+    store.close()
+
+    item = PersistentCache(tmp_path / "cache.sqlite3").get("genres")
+    assert item.value() == ["Rock", "Jazz"]
+    assert item.expired() is False
+
+
+def test_persistent_cache_missing_key(tmp_path):
+    store = PersistentCache(tmp_path / "cache.sqlite3")
+    assert store.get("genres") is None
+
+
+def test_warm_restart_without_network(tmp_path):
+    radionet = RadioNetClient(proxy_config=None)
+    radionet.set_persistent_cache(tmp_path / "cache.sqlite3")
+    radionet.set_cache("genres", [{"systemEnglish": "Rock"}], 1440)
+    radionet.persistent_cache.close()
+
+    restarted = RadioNetClient(proxy_config=None)
+    restarted.set_persistent_cache(tmp_path / "cache.sqlite3")
+    with mock.patch.object(restarted, "do_get") as do_get:
+        assert restarted.get_genres() == [{"systemEnglish": "Rock"}]
+        do_get.assert_not_called()
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache["a"] = 1
+    cache["b"] = 2
+    cache.get("a")
+    cache["c"] = 3
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_lru_cache_purges_expired_items():
+    cache = LRUCache(10)
+    cache["old"] = CacheItem("value", expires=-1)
+    cache["new"] = CacheItem("value", expires=10)
+
+    assert cache.purge_expired() == 1
+    assert "old" not in cache
+    assert "new" in cache
+
+
+def test_single_flight_merges_concurrent_calls():
+    single_flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "value"
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        first = executor.submit(single_flight.do, "key", fetch)
+        started.wait(5)
+        others = [
+            executor.submit(single_flight.do, "key", fetch) for _ in range(3)
+        ]
+        time.sleep(0.05)
+        release.set()
+        results = [first.result()] + [future.result() for future in others]
+
+    assert results == ["value"] * 4
+    assert len(calls) == 1
+    assert single_flight.running("key") is False
+
+
+def test_stale_value_is_served_and_refreshed(radionet):
+    radionet.cache["genres"] = CacheItem(["Rock"], expires=-1)
+
+    def fetch_items(key):
+        return radionet.set_cache(key, ["Rock", "Jazz"], 1440)
+
+    with mock.patch.object(radionet, "_fetch_items", side_effect=fetch_items):
+        assert radionet.get_genres() == ["Rock"]
+        radionet.run_in_background(lambda: None).result(5)
+        assert radionet.get_genres() == ["Rock", "Jazz"]
+
+
+def test_persistent_cache_keeps_validators(tmp_path):
+    store = PersistentCache(tmp_path / "cache.sqlite3")
+    store.set("genres", CacheItem(["Rock"], 10, validators={"etag": '"v1"'}))
+    store.close()
+
+    item = PersistentCache(tmp_path / "cache.sqlite3").get("genres")
+    assert item.validators == {"etag": '"v1"'}
+
+
+def test_persistent_cache_upgrades_old_database(tmp_path):
+    connection = sqlite3.connect(str(tmp_path / "cache.sqlite3"))
+    connection.execute(
+        "CREATE TABLE cache (key TEXT PRIMARY KEY, expires REAL, value BLOB)"
+    )
+    connection.execute(
+        "INSERT INTO cache VALUES (?, ?, ?)",
+        ("genres", time.time() + 60, pickle.dumps(["Rock"])),
+    )
+    connection.commit()
+    connection.close()
+
+    item = PersistentCache(tmp_path / "cache.sqlite3").get("genres")
+    assert item.value() == ["Rock"]
+    assert item.validators is None
+
+
+def test_persistent_cache_batches_commits(tmp_path):
+    store = PersistentCache(tmp_path / "cache.sqlite3", commit_delay=60)
+    reader = PersistentCache(tmp_path / "cache.sqlite3")
+    assert reader.get("genres") is None
+
+    store.set("genres", CacheItem(["Rock"], 10))
+    store.set("topics", CacheItem(["News"], 10))
+    assert reader.get("genres") is None
+    store.flush()
+    assert reader.get("genres").value() == ["Rock"]
+    assert reader.get("topics").value() == ["News"]
+    store.close()
+
+
+def test_persistent_cache_purges_expired_entries(tmp_path):
+    store = PersistentCache(tmp_path / "cache.sqlite3", stale_time=60)
+    store.set("old", CacheItem("value", expires=-2))
+    store.set("stale", CacheItem("value", expires=-0.5))
+    store.close()
+
+    store = PersistentCache(tmp_path / "cache.sqlite3", stale_time=60)
+    assert store.get("old") is None
+    assert store.get("stale").value() == "value"
+    store.close()
@@ -0,0 +1,116 @@
+import json
+from unittest import mock
+
+import responses
+
+from mopidy_radionet.crawler import (
+    CatalogCrawler,
+    load_snapshot,
+    read_snapshot,
+    write_snapshot,
+)
+from mopidy_radionet.index import StationIndex
+
+
+def add_genre_pages(radionet, station_match, pages, failing=()):
+    def callback(request):
+        page = int(request.params["pageindex"])
+        if page in failing:
+            failing.remove(page)
+            return 404, {}, ""
+        body = {
+            "numberPages": pages,
+            "categories": [
+                {"matches": [station_match(page, "Rock %d" % page)]}
+            ],
+        }
+        return 200, {}, json.dumps(body)
+
+    responses.add_callback(
+        responses.GET,
+        radionet.api_prefix + "/search/stationsbygenre",
+        callback=callback,
+    )
+
+
+def get_items(category):
+    return [{"systemEnglish": "Rock"}] if category == "genres" else []
+
+
+@responses.activate
+def test_crawl_and_incremental_recrawl(radionet, station_match):
+    add_genre_pages(radionet, station_match, 3)
+
+    with mock.patch.object(radionet, "_get_items", side_effect=get_items):
+        snapshot = CatalogCrawler(radionet, requests_per_second=0).crawl()
+        assert len(responses.calls) == 3
+
+        again = CatalogCrawler(radionet, requests_per_second=0).crawl(snapshot)
+        assert len(responses.calls) == 4
+
+    assert snapshot["categories"]["genres/Rock"]["stations"] == [1, 2, 3]
+    assert sorted(record[0] for record in again["stations"]) == [1, 2, 3]
+
+
+@responses.activate
+def test_incomplete_crawl_is_crawled_again(radionet, station_match):
+    add_genre_pages(radionet, station_match, 3, failing={2})
+
+    with mock.patch.object(radionet, "_get_items", side_effect=get_items):
+        crawler = CatalogCrawler(radionet, requests_per_second=0)
+        snapshot = crawler.crawl()
+        assert len(responses.calls) == 3
+
+        again = CatalogCrawler(radionet, requests_per_second=0).crawl(snapshot)
+        assert len(responses.calls) == 6
+
+    assert snapshot["categories"]["genres/Rock"]["hash"] is None
+    assert snapshot["categories"]["genres/Rock"]["stations"] == [1, 3]
+    assert again["categories"]["genres/Rock"]["stations"] == [1, 2, 3]
+    assert again["categories"]["genres/Rock"]["hash"] is not None
+
+
+@responses.activate
+def test_snapshot_roundtrip(radionet, station_match, tmp_path):
+    add_genre_pages(radionet, station_match, 2)
+    path = tmp_path / "catalog.json.gz"
+
+    with mock.patch.object(radionet, "_get_items", side_effect=get_items):
+        write_snapshot(
+            CatalogCrawler(radionet, requests_per_second=0).crawl(), path
+        )
+
+    radionet.station_index = StationIndex()
+    assert load_snapshot(radionet, path) == 2
+    assert radionet.station_index.is_fresh(60)
+    assert [s.name for s in radionet.station_index.search("rock 2")] == [
+        "Rock 2"
+    ]
+    assert read_snapshot(tmp_path / "missing.json.gz") is None
+
+
+@responses.activate
+def test_snapshot_leaves_live_stations_alone(
+    radionet, station_match, tmp_path
+):
+    add_genre_pages(radionet, station_match, 2)
+    path = tmp_path / "catalog.json.gz"
+    with mock.patch.object(radionet, "_get_items", side_effect=get_items):
+        snapshot = CatalogCrawler(radionet, requests_per_second=0).crawl()
+    write_snapshot(snapshot, path)
+
+    station = radionet.stations_by_id[1]
+    assert station.genres is None
+    assert snapshot["stations"][0][6] == "Rock"
+
+    radionet.stations_by_id.clear()
+    radionet.station_index = StationIndex()
+    live = radionet._get_station_from_search_result(station_match(1, "Live"))
+    assert load_snapshot(radionet, path) == 2
+
+    assert live.name == "Live"
+    assert radionet.stations_by_id.get(2) is None
+    assert [s.name for s in radionet.station_index.search("rock")] == [
+        "Rock 2"
+    ]
+    assert radionet.station_index.search("live") == [live]
@@ -0,0 +1,50 @@
+import json
+from unittest import mock
+
+from mopidy_radionet import decoding
+from mopidy_radionet.decoding import get_decoder, project_match
+
+
+def test_get_decoder_falls_back_to_json():
+    with mock.patch.dict(decoding.DECODERS, {"json": json.loads}, clear=True):
+        assert get_decoder("auto") is json.loads
+        assert get_decoder("orjson") is json.loads
+
+
+def test_decoders_agree():
+    payload = json.dumps({"name": {"value": "Radio Łódź"}, "id": 1}).encode(
+        "utf-8"
+    )
+    for loads in decoding.DECODERS.values():
+        assert loads(payload) == {"name": {"value": "Radio Łódź"}, "id": 1}
+
+
+def test_project_match(station_match):
+    match = station_match(9931)
+    match["city"] = None
+    match["rank"] = 12
+    assert project_match(match) == (
+        9931,
+        "Europe",
+        "Poland",
+        "",
+        "Station 9931",
+        "station9931",
+        "Description of Station 9931",
+        "https://static.radio.net/9931_44.png",
+        "https://static.radio.net/9931_100.png",
+        "https://static.radio.net/9931_175.png",
+    )
+
+
+def test_unchanged_station_is_not_reindexed(radionet, station_match):
+    radionet.station_index = mock.Mock()
+    station = radionet._get_station_from_search_result(station_match(9932))
+    again = radionet._get_station_from_search_result(station_match(9932))
+    renamed = radionet._get_station_from_search_result(
+        station_match(9932, "New")
+    )
+
+    assert again is station is renamed
+    assert station.name == "New"
+    assert radionet.station_index.add.call_count == 2
@@ -0,0 +1,88 @@
+from unittest import mock
+
+from mopidy.models import TlTrack, Track
+
+from mopidy_radionet.failover import StreamWatchdog
+
+
+def future(value):
+    result = mock.Mock()
+    result.get.return_value = value
+    return result
+
+
+def make_watchdog(states, positions, fail_stream=True):
+    """Core reports ``states`` and ``positions`` for tlid 1, then stops."""
+    states = iter(states)
+    positions = iter(positions)
+
+    core = mock.Mock()
+    core.playback.get_state.side_effect = lambda: future(next(states))
+    core.playback.get_current_tlid.return_value = future(1)
+    core.playback.get_time_position.side_effect = lambda: future(
+        next(positions)
+    )
+    watchdog = StreamWatchdog(
+        core, mock.Mock(return_value=fail_stream), stream_timeout=0.05
+    )
+    watchdog.poll_interval = 0.01
+    return watchdog
+
+
+def test_stalled_stream_is_played_again():
+    watchdog = make_watchdog(["playing"] * 100, [0] * 100)
+
+    watchdog._watch(1, watchdog.cancel())
+
+    watchdog.fail_stream.assert_called_once_with()
+    watchdog.core.playback.play.assert_called_once_with(tlid=1)
+
+
+def test_stream_ended_in_core_is_left_alone():
+    # the server closed the stream, core stopped on end of stream
+    states = ["playing"] * 3 + ["stopped"] * 100
+    watchdog = make_watchdog(states, [1000, 2000, 3000])
+
+    watchdog._watch(1, watchdog.cancel())
+
+    watchdog.fail_stream.assert_not_called()
+    watchdog.core.playback.play.assert_not_called()
+
+
+def test_changed_track_is_left_alone():
+    watchdog = make_watchdog(["playing"] * 100, [0] * 100)
+    watchdog.core.playback.get_current_tlid.return_value = future(2)
+
+    watchdog._watch(1, watchdog.cancel())
+
+    watchdog.fail_stream.assert_not_called()
+
+
+def test_station_without_other_streams_is_not_replayed():
+    watchdog = make_watchdog(["playing"] * 100, [0] * 100, False)
+
+    watchdog._watch(1, watchdog.cancel())
+
+    watchdog.fail_stream.assert_called_once_with()
+    watchdog.core.playback.play.assert_not_called()
+
+
+def test_cancel_stops_watching():
+    watchdog = make_watchdog(["playing"] * 100, [0] * 100)
+    generation = watchdog.cancel()
+    watchdog.cancel()
+
+    watchdog._watch(1, generation)
+
+    watchdog.core.playback.get_state.assert_not_called()
+
+
+def test_watch_starts_thread():
+    watchdog = make_watchdog([], [])
+    tl_track = TlTrack(1, Track(uri="radionet:track:2180"))
+
+    with mock.patch("threading.Thread") as thread:
+        watchdog.watch(tl_track)
+
+    assert thread.call_args.kwargs["args"] == (1, watchdog._generation)
+    thread.return_value.start.assert_called_once_with()
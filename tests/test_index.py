@@ -0,0 +1,65 @@
+from mopidy_radionet.index import StationIndex, tokenize
+from mopidy_radionet.radionet import Station
+
+
+def make_station(
+    station_id, name, city="Warsaw", genres="Pop", description=""
+):
+    station = Station()
+    station.id = station_id
+    station.name = name
+    station.city = city
+    station.country = "Poland"
+    station.genres = genres
+    station.description = description
+    station.playable = True
+    return station
+
+
+def test_tokenize_strips_case_and_diacritics():
+    assert tokenize("Radio Kraków FM") == ["radio", "krakow", "fm"]
+
+
+def test_search_by_prefix_and_fields():
+    index = StationIndex()
+    index.add(make_station(1, "Radio Ram", city="Kraków", genres="Rock"))
+    index.add(make_station(2, "Jazz Radio", genres="Jazz"))
+    index.add(make_station(3, "Eska"))
+
+    assert [s.id for s in index.search("rad")] == [2, 1]
+    assert [s.id for s in index.search("radio krakow")] == [1]
+    assert [s.id for s in index.search("jazz")] == [2]
+    assert [s.id for s in index.search("rad", 1)] == [2]
+    assert [s.id for s in index.search("rad", 0)] == [2, 1]
+    assert index.search("metal") == []
+
+
+def test_readding_station_updates_tokens():
+    index = StationIndex()
+    station = make_station(1, "Old Name")
+    index.add(station)
+    station.name = "New Name"
+    index.add(station)
+
+    assert index.search("old") == []
+    assert [s.id for s in index.search("new")] == [1]
+    assert len(index) == 1
+
+
+def test_freshness():
+    index = StationIndex()
+    assert index.is_fresh(60) is False
+
+    index.mark_seeded()
+    assert index.is_fresh(60) is True
+    assert index.is_fresh(0) is False
+
+
+def test_large_index_is_fresh():
+    index = StationIndex()
+    index.add(make_station(1, "Eska"))
+    index.add(make_station(2, "Zet"))
+
+    assert index.is_fresh(60, 3) is False
+    assert index.is_fresh(60, 2) is True
+    assert index.is_fresh(60, None) is False
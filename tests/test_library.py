@@ -1,3 +1,7 @@
+from unittest import mock
+
+from mopidy_radionet.index import StationIndex
+from mopidy_radionet.radionet import Station
 
 
 def test_browse_root(library):
@@ -170,3 +174,148 @@ def test_track_by_slug(library):
     results = library.lookup('radionet:track:dancefm')
     assert 1 == len(results)
     assert results[0].uri == 'radionet:track:2180'
+
+
+def test_search_max_results(library, station_match):
+    library.backend.radionet.search_max_results = 3
+    with mock.patch.object(
+        library.backend.radionet,
+        "_search_page",
+        return_value={
+            "numberPages": 5,
+            "categories": [{"matches": [station_match(i) for i in range(50)]}],
+        },
+    ) as search_page:
+        result = library.search({"any": ["radio"]})
+
+    assert len(result.tracks) == 3
+    search_page.assert_called_once_with("radio", 1)
+
+
+def test_get_images_uses_station_index(library, station_match):
+    radionet = library.backend.radionet
+    station = radionet._get_station_from_search_result(station_match(9001))
+
+    with mock.patch.object(
+        radionet, "_get_station_by_id"
+    ) as get_station_by_id:
+        images = library.get_images(["radionet:station:9001"])
+        get_station_by_id.assert_not_called()
+
+    assert [image.uri for image in images["radionet:station:9001"]] == [
+        station.image_tiny,
+        station.image_small,
+        station.image_medium,
+    ]
+
+
+def test_get_images_fetches_missing_stations_once(library):
+    radionet = library.backend.radionet
+    station = Station()
+    station.image_large = "https://static.radio.net/9002_300.png"
+
+    with mock.patch.object(
+        radionet, "_get_station_by_id", return_value=station
+    ) as get_station_by_id:
+        images = library.get_images(
+            ["radionet:station:9002", "radionet:track:9002"]
+        )
+
+    get_station_by_id.assert_called_once_with(9002)
+    assert len(images) == 2
+
+
+def test_lookup_memoizes_tracks(library):
+    radionet = library.backend.radionet
+    station = Station()
+    station.id = 9003
+    station.name = "Station 9003"
+    station.description = "Description"
+    station.continent = "Europe"
+    station.country = "Poland"
+    station.city = "Warsaw"
+    station.genres = "Pop"
+
+    uris = [
+        "radionet:station:9003",
+        "radionet:track:9003",
+        "radionet:track:station9003",
+    ]
+    with mock.patch.object(
+        radionet, "_get_station_by_id", return_value=station
+    ) as get_station_by_id:
+        result = {uri: library.lookup(uri) for uri in uris}
+        assert get_station_by_id.call_count == 3
+        again = library.lookup(uris[0])
+
+    assert result["radionet:station:9003"][0].uri == "radionet:track:9003"
+    assert (
+        result["radionet:track:station9003"][0]
+        is result["radionet:track:9003"][0]
+    )
+    assert again[0] is result["radionet:station:9003"][0]
+
+
+def test_search_uses_fresh_local_index(library, station_match):
+    radionet = library.backend.radionet
+    radionet.station_index = StationIndex()
+    radionet._get_station_from_search_result(
+        station_match(9201, "Offline Radio")
+    )
+    radionet.station_index.mark_seeded()
+
+    with mock.patch.object(radionet, "do_get") as do_get:
+        result = library.search({"any": ["offline"]})
+        do_get.assert_not_called()
+
+    assert [track.uri for track in result.tracks] == ["radionet:station:9201"]
+
+
+def test_search_uses_local_index_while_api_is_paused(
+    library, station_match
+):
+    radionet = library.backend.radionet
+    radionet.station_index = StationIndex()
+    station = station_match(9202, "Offline Radio")
+    radionet._get_station_from_search_result(station)
+    radionet._record_failure()
+
+    with mock.patch.object(radionet, "do_get") as do_get:
+        do_get.return_value = None
+        library.search({"any": ["offline"]})
+        do_get.assert_called()
+
+        for _ in range(radionet.breaker_threshold):
+            radionet._record_failure()
+        do_get.reset_mock()
+        result = library.search({"any": ["offline"]})
+        do_get.assert_not_called()
+
+    assert [t.uri for t in result.tracks] == ["radionet:station:9202"]
+
+
+def test_search_falls_back_to_api_without_index_match(
+    library, station_match
+):
+    radionet = library.backend.radionet
+    radionet.station_index = StationIndex()
+    radionet.station_index.mark_seeded()
+
+    with mock.patch.object(radionet, "iter_search") as iter_search:
+        iter_search.return_value = iter([])
+        library.search({"any": ["missing"]})
+
+    iter_search.assert_called_once_with("missing", radionet.search_max_results)
+
+
+def test_models_are_memoized_until_station_changes(library):
+    station = Station(9501)
+    station.name = "Before"
+
+    ref = library.station_to_ref(station)
+    assert library.station_to_ref(station) is ref
+
+    station.name = "After"
+    changed = library.station_to_ref(station)
+    assert changed is not ref
+    assert changed.name == "After"
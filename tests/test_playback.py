@@ -0,0 +1,67 @@
+from unittest import mock
+
+from mopidy.models import Track
+
+from mopidy_radionet.backend import RadioNetPlaybackProvider
+
+
+def make_playback(backend_mock):
+    audio = mock.Mock()
+    audio.start_playback.return_value.get.return_value = True
+    return RadioNetPlaybackProvider(audio=audio, backend=backend_mock)
+
+
+def stream_urls(radionet, urls):
+    return mock.patch.object(radionet, "get_stream_urls", return_value=urls)
+
+
+def test_failed_stream_is_marked_dead(backend_mock):
+    playback = make_playback(backend_mock)
+    radionet = backend_mock.radionet
+
+    with stream_urls(radionet, ["http://a/stream", "http://b/stream"]):
+        assert playback.change_track(Track(uri="radionet:track:2180"))
+
+    assert playback.fail_stream() is True
+    assert radionet.is_stream_dead("http://a/stream")
+    assert not radionet.is_stream_dead("http://b/stream")
+
+
+def test_last_stream_has_no_failover(backend_mock):
+    playback = make_playback(backend_mock)
+
+    with stream_urls(backend_mock.radionet, ["http://a/stream"]):
+        playback.change_track(Track(uri="radionet:track:2180"))
+
+    assert playback.fail_stream() is False
+    assert backend_mock.radionet.is_stream_dead("http://a/stream")
+
+
+def test_stream_that_does_not_start_is_marked_dead(backend_mock):
+    playback = make_playback(backend_mock)
+    playback.audio.start_playback.return_value.get.return_value = False
+
+    with stream_urls(backend_mock.radionet, ["http://a/stream"]):
+        playback.change_track(Track(uri="radionet:track:2180"))
+
+    assert playback.play() is False
+    assert backend_mock.radionet.is_stream_dead("http://a/stream")
+
+
+def test_dead_streams_are_skipped(radionet):
+    station = radionet._get_or_create_station(9701)
+    station.stream_url = "http://a/stream"
+    station.streams = (("http://a/stream", 128), ("http://b/stream", 64))
+    radionet.stations_by_id[9701] = station
+
+    assert radionet.get_stream_urls(9701) == [
+        "http://a/stream",
+        "http://b/stream",
+    ]
+    radionet.mark_stream_dead("http://a/stream")
+    assert radionet.get_stream_urls(9701) == ["http://b/stream"]
+    radionet.mark_stream_dead("http://b/stream")
+    assert radionet.get_stream_urls(9701) == [
+        "http://a/stream",
+        "http://b/stream",
+    ]
@@ -0,0 +1,142 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import responses
+
+from mopidy_radionet.probe import (
+    StreamProbe,
+    StreamProber,
+    probe_stream,
+    rank_streams,
+)
+
+
+class StreamHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/dead":
+            self.send_error(404)
+            return
+        if self.path == "/redirect":
+            self.send_response(302)
+            self.send_header("Location", "/fast")
+            self.end_headers()
+            return
+        if self.path == "/slow":
+            time.sleep(0.3)
+        self.send_response(200)
+        if self.path == "/html":
+            self.send_header("Content-Type", "text/html")
+        else:
+            self.send_header("Content-Type", "audio/mpeg")
+        self.end_headers()
+        self.wfile.write(b"\xff\xfb" * 64)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stream_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StreamHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield "http://127.0.0.1:%d" % server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+def test_probe_stream(stream_server):
+    probe = probe_stream(stream_server + "/fast", 128)
+    assert probe.healthy is True
+    assert probe.content_type == "audio/mpeg"
+    assert 0 <= probe.connect_time <= probe.first_byte_time
+
+    assert probe_stream(stream_server + "/dead").healthy is False
+    assert probe_stream(stream_server + "/html").healthy is False
+    assert probe_stream(stream_server + "/redirect").healthy is True
+    assert probe_stream("http://127.0.0.1:1/closed").healthy is False
+
+
+def test_rank_streams_prefers_healthy_fast_streams():
+    probes = [
+        StreamProbe("dead", 128, False, 0.01, None, None),
+        StreamProbe("slow", 128, True, 0.01, 0.5, "audio/mpeg"),
+        StreamProbe("low", 32, True, 0.01, 0.05, "audio/mpeg"),
+        StreamProbe("fast", 128, True, 0.01, 0.1, "audio/mpeg"),
+    ]
+    ranking = rank_streams(probes, 96)
+    assert [probe.url for probe in ranking] == ["fast", "slow", "low", "dead"]
+
+
+def test_find_returns_before_slow_probes_finish(stream_server):
+    prober = StreamProber(timeout=2)
+    rankings = []
+    done = threading.Event()
+
+    def callback(ranking):
+        rankings.append(ranking)
+        done.set()
+
+    streams = [
+        (stream_server + "/slow", 128),
+        (stream_server + "/fast", 64),
+        (stream_server + "/fast", 128),
+    ]
+    try:
+        started = time.time()
+        probe = prober.find(streams, 96, callback=callback)
+        assert time.time() - started < 0.3
+        assert (probe.url, probe.bit_rate) == (stream_server + "/fast", 128)
+        assert not rankings
+
+        assert done.wait(2)
+        assert [p.bit_rate for p in rankings[0]] == [128, 128, 64]
+    finally:
+        prober.close()
+
+
+def test_find_falls_back_to_best_healthy_stream(stream_server):
+    prober = StreamProber(timeout=2)
+    streams = [(stream_server + "/dead", 128), (stream_server + "/fast", 32)]
+    try:
+        assert prober.find(streams, 96).url == stream_server + "/fast"
+        assert prober.find(streams[:1], 96) is None
+    finally:
+        prober.close()
+
+
+@responses.activate
+def test_translate_to_fastest_healthy_stream(
+    radionet, station_json, stream_server
+):
+    responses.add_passthru(stream_server)
+    radionet.stream_prober = StreamProber(timeout=2)
+    stream_urls = [
+        {
+            "streamUrl": stream_server + path,
+            "bitRate": 128,
+            "streamStatus": "VALID",
+        }
+        for path in ("/dead", "/slow", "/fast")
+    ]
+    responses.add(
+        responses.GET,
+        radionet.api_prefix + "/search/station",
+        json=station_json(9601, stream_urls=stream_urls),
+    )
+
+    try:
+        assert radionet.get_stream_url(9601) == stream_server + "/fast"
+        station = radionet.get_station_by_id(9601)
+        assert station.stream_url == stream_server + "/dead"
+        assert [p.url for p in radionet.get_ranked_streams(station)] == [
+            stream_server + "/fast",
+            stream_server + "/slow",
+            stream_server + "/dead",
+        ]
+    finally:
+        radionet.stream_prober.close()
+        radionet.stream_prober = None
@@ -1,3 +1,13 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import responses
+
+from mopidy_radionet.cache import CacheItem
+from mopidy_radionet.radionet import RadioNetClient, Station
 
 
 def test_get_genres(radionet):
@@ -40,3 +50,379 @@ def test_favorites_broken_slug(radionet):
     radionet.set_favorites(test_favorites)
     result = radionet.get_favorites()
     assert len(result) == 0
+
+
+@responses.activate
+def test_do_search_fetches_pages_in_order(radionet, station_match):
+    def callback(request):
+        page = int(request.params["pageindex"])
+        body = {
+            "numberPages": 3,
+            "categories": [
+                {"matches": [station_match(page * 100 + i) for i in range(2)]}
+            ],
+        }
+        return 200, {}, json.dumps(body)
+
+    responses.add_callback(
+        responses.GET,
+        radionet.api_prefix + "/search/stationsonly",
+        callback=callback,
+    )
+
+    result = radionet.do_search("radio")
+
+    assert [station.id for station in result] == [100, 101, 200, 201, 300, 301]
+    assert len(responses.calls) == 3
+
+
+@responses.activate
+def test_do_search_page_cap(radionet, station_match):
+    responses.add(
+        responses.GET,
+        radionet.api_prefix + "/search/stationsonly",
+        json={
+            "numberPages": 20,
+            "categories": [{"matches": [station_match(1)]}],
+        },
+    )
+    radionet.search_max_pages = 2
+
+    radionet.do_search("radio")
+
+    assert len(responses.calls) == 2
+
+
+@responses.activate
+def test_iter_search_stops_early(radionet, station_match):
+    def callback(request):
+        page = int(request.params["pageindex"])
+        body = {
+            "numberPages": 10,
+            "categories": [
+                {"matches": [station_match(page * 100 + i) for i in range(50)]}
+            ],
+        }
+        return 200, {}, json.dumps(body)
+
+    responses.add_callback(
+        responses.GET,
+        radionet.api_prefix + "/search/stationsonly",
+        callback=callback,
+    )
+
+    result = list(radionet.iter_search("radio", 20))
+
+    assert len(result) == 20
+    assert len(responses.calls) == 1
+
+
+@responses.activate
+def test_iter_search_fetches_only_needed_pages(radionet, station_match):
+    def callback(request):
+        page = int(request.params["pageindex"])
+        matches = [station_match(page * 100 + i) for i in range(50)]
+        body = {"numberPages": 10, "categories": [{"matches": matches}]}
+        return 200, {}, json.dumps(body)
+
+    responses.add_callback(
+        responses.GET,
+        radionet.api_prefix + "/search/stationsonly",
+        callback=callback,
+    )
+
+    result = list(radionet.iter_search("radio", 100))
+
+    assert len(result) == 100
+    assert len(responses.calls) == 2
+
+
+@responses.activate
+def test_zero_max_results_does_not_cap_search(radionet, station_match):
+    responses.add(
+        responses.GET,
+        radionet.api_prefix + "/search/stationsonly",
+        json={
+            "numberPages": 1,
+            "categories": [{"matches": [station_match(1), station_match(2)]}],
+        },
+    )
+
+    assert len(list(radionet.iter_search("radio", 0))) == 2
+
+
+def test_get_favorites_keeps_order_and_isolates_failures(radionet):
+    stations = {}
+    for slug in ["one", "two", "three"]:
+        stations[slug] = Station()
+        stations[slug].name = slug
+        stations[slug].playable = True
+
+    def get_station_by_slug(slug):
+        if slug == "broken":
+            raise ValueError(slug)
+        return stations[slug]
+
+    radionet.set_favorites(["one", "broken", "two", "three"])
+    with mock.patch.object(
+        radionet, "get_station_by_slug", side_effect=get_station_by_slug
+    ):
+        result = radionet.get_favorites()
+
+    assert [station.name for station in result] == ["one", "two", "three"]
+
+
+def test_warm_up_prefetches_lists(radionet):
+    radionet.set_favorites(["one"])
+    with mock.patch.object(
+        radionet, "_get_items"
+    ) as get_items, mock.patch.object(
+        radionet, "get_category"
+    ) as get_category, mock.patch.object(
+        radionet, "get_favorites"
+    ) as get_favorites:
+        get_items.side_effect = ValueError(
+            "failing list must not stop warm-up"
+        )
+        radionet.warm_up()
+
+    assert get_items.call_count == 5
+    get_category.assert_has_calls(
+        [mock.call("topstations", 1), mock.call("localstations", 1)],
+        any_order=True,
+    )
+    get_favorites.assert_called_once_with()
+
+
+@responses.activate
+def test_do_get_retries_server_errors(radionet):
+    url = radionet.api_prefix + "/search/getgenres"
+    responses.add(responses.GET, url, status=503)
+    responses.add(responses.GET, url, json=[{"systemEnglish": "Rock"}])
+    radionet.backoff_factor = 0
+
+    response = radionet.do_get("/search/getgenres")
+
+    assert response.status_code == 200
+    assert len(responses.calls) == 2
+
+
+@responses.activate
+def test_circuit_breaker_stops_requests(radionet):
+    url = radionet.api_prefix + "/search/getgenres"
+    responses.add(responses.GET, url, status=500)
+    radionet.backoff_factor = 0
+    radionet.retries = 0
+    radionet.breaker_threshold = 2
+
+    assert radionet.do_get("/search/getgenres").status_code == 500
+    assert radionet.do_get("/search/getgenres").status_code == 500
+    assert radionet.do_get("/search/getgenres") is None
+    assert len(responses.calls) == 2
+
+
+def test_station_objects_are_shared(radionet, station_match):
+    station = radionet._get_station_from_search_result(station_match(9301))
+    again = radionet._get_station_from_search_result(station_match(9301))
+    other = radionet._get_station_from_search_result(
+        json.loads(json.dumps(station_match(9302)))
+    )
+
+    assert again is station
+    assert other.country is station.country
+    assert not hasattr(station, "__dict__")
+
+
+def test_station_logos_share_their_common_parts():
+    first = Station(1)
+    second = Station(2)
+    for station in (first, second):
+        station.set_images(
+            *(
+                "https://images.example.com/%d/station%d.png"
+                % (size, station.id)
+                for size in (44, 100, 175)
+            )
+        )
+
+    assert first.image_small == "https://images.example.com/100/station1.png"
+    assert first.image_large is None
+    assert first._image_prefix is second._image_prefix
+    assert first._image_parts is second._image_parts
+
+    first.image_large = "https://images.example.com/300/station1.png"
+    assert first.images[1:] == (
+        "https://images.example.com/100/station1.png",
+        "https://images.example.com/175/station1.png",
+        "https://images.example.com/300/station1.png",
+    )
+
+
+def test_stream_url_is_the_first_stream():
+    station = Station(1)
+    station.streams = (("http://a/stream", 128), ("http://b/stream", 64))
+    assert station.stream_url == "http://a/stream"
+
+    station.stream_url = "http://b/stream"
+    assert station.streams == (
+        ("http://b/stream", 64),
+        ("http://a/stream", 128),
+    )
+
+
+@responses.activate
+def test_cached_category_page_is_not_rebuilt(radionet, station_match):
+    responses.add(
+        responses.GET,
+        radionet.api_prefix + "/search/topstations",
+        json={
+            "numberPages": 1,
+            "categories": [{"matches": [station_match(9401)]}],
+        },
+    )
+
+    first = radionet.get_category("topstations", 1)
+    with mock.patch.object(
+        radionet, "_get_station_from_search_result"
+    ) as rebuild:
+        second = radionet.get_category("topstations", 1)
+        rebuild.assert_not_called()
+
+    assert second == first
+    assert second[0].id == 9401
+    assert len(responses.calls) == 1
+
+
+@responses.activate
+def test_prefetched_stream_url_is_served_from_cache(
+    radionet, station_match, station_json
+):
+    radionet._get_station_from_search_result(station_match(9501))
+    responses.add(
+        responses.GET,
+        radionet.api_prefix + "/search/station",
+        json=station_json(9501),
+    )
+
+    radionet.prefetch_stream_urls([9501, 9501]).result(5)
+    assert len(responses.calls) == 1
+    assert radionet.prefetch_stream_urls([9501]) is None
+
+    radionet.stations_by_id.pop(9501)
+    radionet.cache.pop("station/9501")
+    assert radionet.get_stream_url(9501) == "http://stream.example.com/9501"
+    assert (
+        radionet.get_stream_url("station9501")
+        == "http://stream.example.com/9501"
+    )
+    assert len(responses.calls) == 1
+
+
+def test_clients_do_not_share_state():
+    first = RadioNetClient(proxy_config=None)
+    second = RadioNetClient(proxy_config=None)
+    first.set_cache("genres", ["Rock"], 10)
+    first._get_or_create_station(9801)
+
+    assert second.get_cache("genres") is None
+    assert second.stations_by_id.get(9801) is None
+    assert first.session is not second.session
+
+
+def test_concurrent_station_creation_is_atomic(radionet):
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        stations = list(
+            executor.map(radionet._get_or_create_station, [9901] * 64)
+        )
+    assert all(station is stations[0] for station in stations)
+
+
+@responses.activate
+def test_identical_requests_share_one_call(radionet, station_match):
+    started = threading.Event()
+    release = threading.Event()
+
+    def callback(request):
+        started.set()
+        release.wait(5)
+        body = {
+            "numberPages": 1,
+            "categories": [{"matches": [station_match(9911)]}],
+        }
+        return 200, {}, json.dumps(body)
+
+    url = radionet.api_prefix + "/search/stationsbygenre"
+    responses.add_callback(responses.GET, url, callback=callback)
+    params = {
+        "genre": "Rock",
+        "sorttype": "RANK",
+        "sizeperpage": 50,
+        "pageindex": 1,
+    }
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        first = executor.submit(
+            radionet._get_json, "/search/stationsbygenre", params
+        )
+        started.wait(5)
+        reordered = dict(reversed(list(params.items())))
+        others = [
+            executor.submit(
+                radionet._get_json, "/search/stationsbygenre", reordered
+            )
+            for _ in range(3)
+        ]
+        time.sleep(0.05)
+        release.set()
+        results = [first.result()] + [future.result() for future in others]
+
+    assert len(responses.calls) == 1
+    assert all(result is results[0] for result in results)
+
+
+@responses.activate
+def test_refresh_sends_validators_and_keeps_value_on_304(
+    radionet, station_match
+):
+    url = radionet.api_prefix + "/search/topstations"
+    body = {
+        "numberPages": 1,
+        "categories": [{"matches": [station_match(9921)]}],
+    }
+    responses.add(responses.GET, url, json=body, headers={"ETag": '"v1"'})
+    responses.add(responses.GET, url, status=304)
+
+    first = radionet._fetch_category("topstations", 1)
+    radionet.cache["topstations/1"] = CacheItem(
+        first,
+        expires=-1,
+        validators=radionet.cache["topstations/1"].validators,
+    )
+    with mock.patch.object(
+        radionet, "_get_station_from_search_result"
+    ) as rebuild:
+        second = radionet._fetch_category("topstations", 1)
+        rebuild.assert_not_called()
+
+    assert second is first
+    assert responses.calls[1].request.headers["if-none-match"] == '"v1"'
+    assert radionet.cache["topstations/1"].expired() is False
+    assert radionet.cache["topstations/1"].validators == {"etag": '"v1"'}
+
+
+@responses.activate
+def test_evicted_page_count_is_fetched_again(radionet, station_match):
+    url = radionet.api_prefix + "/search/stationsbygenre"
+    body = {
+        "numberPages": 3,
+        "categories": [{"matches": [station_match(9941)]}],
+    }
+    responses.add(responses.GET, url, json=body, headers={"ETag": '"v1"'})
+    responses.add(responses.GET, url, status=304)
+    responses.add(responses.GET, url, json=body, headers={"ETag": '"v1"'})
+
+    assert radionet.get_sorted_category_pages("genres", "Rock") == 3
+    radionet.cache.pop("genres/Rock")
+
+    assert radionet.get_sorted_category_pages("genres", "Rock") == 3
+    assert len(responses.calls) == 3
@@ -0,0 +1,83 @@
+import threading
+import time
+from email.utils import formatdate
+
+import responses
+
+from mopidy_radionet.ratelimit import (
+    BACKGROUND,
+    INTERACTIVE,
+    RateLimiter,
+    parse_retry_after,
+)
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    assert (
+        8 < parse_retry_after(formatdate(time.time() + 10, usegmt=True)) <= 10
+    )
+
+
+def test_rate_limiter_allows_burst_then_spaces_requests():
+    limiter = RateLimiter(50, burst=5)
+    started = time.monotonic()
+    for _ in range(10):
+        limiter.acquire()
+    assert 0.08 <= time.monotonic() - started < 0.5
+
+
+def test_interactive_requests_go_first():
+    limiter = RateLimiter(20, burst=1)
+    limiter.acquire()
+    order = []
+
+    def acquire(name, priority):
+        limiter.acquire(priority)
+        order.append(name)
+
+    background = threading.Thread(
+        target=acquire, args=("background", BACKGROUND)
+    )
+    background.start()
+    time.sleep(0.01)
+    interactive = threading.Thread(
+        target=acquire, args=("interactive", INTERACTIVE)
+    )
+    interactive.start()
+    background.join(5)
+    interactive.join(5)
+
+    assert order == ["interactive", "background"]
+
+
+@responses.activate
+def test_do_get_honours_retry_after(radionet):
+    radionet.set_rate_limit(100, 10)
+    url = radionet.api_prefix + "/search/getgenres"
+    responses.add(
+        responses.GET, url, status=429, headers={"Retry-After": "0.2"}
+    )
+    responses.add(responses.GET, url, json=[{"systemEnglish": "Rock"}])
+
+    started = time.monotonic()
+    response = radionet.do_get("/search/getgenres")
+
+    assert response.status_code == 200
+    assert time.monotonic() - started >= 0.2
+    assert len(responses.calls) == 2
+
+
+def test_background_tasks_run_with_background_priority(radionet):
+    assert radionet.get_priority() == INTERACTIVE
+    radionet.set_max_workers(2)
+
+    def fan_out():
+        return radionet._map(lambda item: radionet.get_priority(), [1, 2, 3])
+
+    assert radionet.run_in_background(fan_out).result(5) == [BACKGROUND] * 3
+    assert radionet._map(lambda item: radionet.get_priority(), [1, 2]) == [
+        INTERACTIVE
+    ] * 2
@@ -0,0 +1,66 @@
+from unittest import mock
+
+import pytest
+
+from mopidy_radionet import backend
+from mopidy_radionet.uri import RadioNetUri, parse_uri
+
+
+INVALID = RadioNetUri(None, None, None, None, None)
+
+
+@pytest.mark.parametrize(
+    "uri,expected",
+    [
+        ("radionet:root", RadioNetUri("root", None, None, None, None)),
+        (
+            "radionet:topstations:2",
+            RadioNetUri("topstations", None, None, 2, None),
+        ),
+        ("radionet:genres", RadioNetUri("genres", None, None, None, None)),
+        (
+            "radionet:genres:Rock",
+            RadioNetUri("genres", "Rock", None, None, None),
+        ),
+        (
+            "radionet:cities:Berlin:az",
+            RadioNetUri("cities", "Berlin", "az", None, None),
+        ),
+        (
+            "radionet:topics:News:rank:3",
+            RadioNetUri("topics", "News", "rank", 3, None),
+        ),
+        (
+            "radionet:station:2180",
+            RadioNetUri("station", None, None, None, 2180),
+        ),
+        ("radionet:track:2180", RadioNetUri("track", None, None, None, 2180)),
+        (
+            "radionet:track:dancefm",
+            RadioNetUri("track", None, None, None, "dancefm"),
+        ),
+        ("radionet:station:dancefm", INVALID),
+        ("radionet:genres:Rock:best", INVALID),
+        ("radionet:genres:", INVALID),
+        ("radionet:localstations:x", INVALID),
+        ("radionet:track:a:b", INVALID),
+        ("spotify:track:1", INVALID),
+    ],
+)
+def test_parse_uri(uri, expected):
+    assert parse_uri(uri) == expected
+
+
+def test_backend_prefetches_radionet_stations(backend_mock):
+    with mock.patch.object(
+        backend_mock.radionet, "prefetch_stream_urls"
+    ) as prefetch:
+        backend.RadioNetBackend.prefetch_streams(
+            backend_mock,
+            [
+                "radionet:track:2180",
+                "radionet:genres",
+                "radionet:track:dancefm",
+            ],
+        )
+    prefetch.assert_called_once_with([2180, "dancefm"])